@@ -0,0 +1,98 @@
+# accounts/account_numbers.py
+"""
+Wallet account number allocation.
+
+A number is "0" + a 10-digit sequence value + a Luhn check digit, which is
+exactly the 12 characters of Wallet.account_number. Legacy numbers were
+truncated uuid4 integers and never start with 0, so old and new numbers
+can't collide.
+
+Sequence values are reserved from the database in blocks of
+ACCOUNT_NUMBER_BLOCK_SIZE that each process hands out from memory, so
+creating a wallet normally costs no query and never needs a uniqueness
+retry. On PostgreSQL blocks come from a native sequence, which is not
+rolled back with the caller's transaction. Other backends use the
+AccountNumberSequence counter row; there, the rest of a block reserved
+inside the caller's transaction is only kept once that transaction
+commits, so a rollback can't leave reused numbers cached in this process.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import AccountNumberSequence
+
+SEQUENCE_NAME = 'accounts_account_number_seq'
+PREFIX = '0'
+SEQUENCE_DIGITS = 10
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        n = int(char)
+        if i % 2 == 0:  # doubled once the check digit is appended
+            n = n * 2 - 9 if n > 4 else n * 2
+        total += n
+    return str(-total % 10)
+
+
+def is_valid(number):
+    return len(number) > 1 and number.isdigit() and luhn_check_digit(number[:-1]) == number[-1]
+
+
+def format_number(value):
+    body = f"{PREFIX}{value:0{SEQUENCE_DIGITS}d}"
+    return body + luhn_check_digit(body)
+
+
+def _reserve(count):
+    """Reserve count sequence values in the database."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{SEQUENCE_NAME}') FROM generate_series(1, %s)", [count])
+            return [value for value, in cursor.fetchall()]
+    with transaction.atomic():
+        sequence, _ = AccountNumberSequence.objects.select_for_update().get_or_create(pk=1)
+        AccountNumberSequence.objects.filter(pk=1).update(next_value=F('next_value') + count)
+    return list(range(sequence.next_value, sequence.next_value + count))
+
+
+class Allocator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._block = []
+
+    def reset(self):
+        self._block = []
+
+    def _keep(self, values):
+        with self._lock:
+            self._block.extend(values)
+
+    def allocate(self, count=1):
+        """Return count new account numbers."""
+        with self._lock:
+            values, self._block = self._block[:count], self._block[count:]
+            missing = count - len(values)
+            if missing:
+                reserved = _reserve(max(missing, settings.ACCOUNT_NUMBER_BLOCK_SIZE))
+                values, rest = values + reserved[:missing], reserved[missing:]
+                if connection.vendor != 'postgresql' and connection.in_atomic_block:
+                    transaction.on_commit(lambda: self._keep(rest))
+                else:
+                    self._block = rest
+        return [format_number(value) for value in values]
+
+
+allocator = Allocator()
+# A forked worker must not hand out its parent's block.
+os.register_at_fork(after_in_child=allocator.reset)
+
+
+def allocate(count=1):
+    return allocator.allocate(count)
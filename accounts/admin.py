@@ -2,8 +2,12 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.admin import SimpleListFilter
+from django.contrib.admin.views.main import SEARCH_VAR
 
 from .models import Profile, Wallet, TransactionHistory
+from . import search, services
+from core.money import format_kes
+from core.paginator import EstimatedCountPaginator
 
 # ----- Custom Filters -----
 
@@ -20,11 +24,11 @@ class BalanceRangeFilter(SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == '<1K':
-            return queryset.filter(balance__lt=1000)
+            return queryset.filter(balance__lt=1000_00)
         elif self.value() == '1K-10K':
-            return queryset.filter(balance__gte=1000, balance__lte=10000)
+            return queryset.filter(balance__gte=1000_00, balance__lte=10000_00)
         elif self.value() == '10K+':
-            return queryset.filter(balance__gt=10000)
+            return queryset.filter(balance__gt=10000_00)
         return queryset
 
 # ----- Inline Admins -----
@@ -63,6 +67,8 @@ admin.site.register(User, UserAdmin)
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'phone', 'date_of_birth', 'address')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
     search_fields = ('user__username', 'phone', 'address')
     list_filter = ('date_of_birth',)
 
@@ -70,14 +76,20 @@ class ProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ('user', 'account_number', 'formatted_balance', 'is_active', 'created_at')
-    search_fields = ('user__username', 'account_number')
+    list_display = ('user', 'account_number', 'formatted_balance', 'shard_count', 'is_active', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('=user__username', '=account_number')
     list_filter = ('is_active', 'created_at', BalanceRangeFilter)
-    readonly_fields = ('account_number', 'created_at')
-    actions = ['freeze_selected_wallets']
+    date_hierarchy = 'created_at'
+    # Balances move only through accounts.services, which keeps the ledger and wallet cache in step.
+    readonly_fields = ('account_number', 'balance', 'shard_count', 'version', 'created_at')
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['freeze_selected_wallets', 'enable_hot_wallet_mode', 'disable_hot_wallet_mode']
 
     def formatted_balance(self, obj):
-        return f"KSh {obj.balance:,.2f}"
+        return format_kes(obj.balance)
     formatted_balance.short_description = 'Balance'
 
     def freeze_selected_wallets(self, request, queryset):
@@ -85,10 +97,40 @@ class WalletAdmin(admin.ModelAdmin):
         self.message_user(request, f"{updated} wallet(s) successfully frozen.")
     freeze_selected_wallets.short_description = "Freeze selected wallets"
 
+    def enable_hot_wallet_mode(self, request, queryset):
+        for wallet in queryset:
+            services.enable_sharding(wallet)
+        self.message_user(request, f"{queryset.count()} wallet(s) switched to hot-wallet mode.")
+    enable_hot_wallet_mode.short_description = "Enable hot-wallet mode (sharded balance)"
+
+    def disable_hot_wallet_mode(self, request, queryset):
+        for wallet in queryset:
+            services.disable_sharding(wallet)
+        self.message_user(request, f"{queryset.count()} wallet(s) switched back to a single balance.")
+    disable_hot_wallet_mode.short_description = "Disable hot-wallet mode"
+
 # ----- Transaction History Admin -----
 
 @admin.register(TransactionHistory)
 class TransactionHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'sender', 'receiver', 'transaction_type', 'amount', 'status', 'timestamp')
+    list_select_related = ('user', 'sender', 'receiver')
     list_filter = ('transaction_type', 'status', 'timestamp')
+    date_hierarchy = 'timestamp'
     search_fields = ('user__username', 'sender__username', 'receiver__username', 'description')
+    autocomplete_fields = ('user', 'sender', 'receiver')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Searches are served by the full-text index (accounts.search) instead of LIKE '%term%' scans.
+    def get_search_results(self, request, queryset, search_term):
+        found = search.expressions(search_term)
+        if found is None:
+            return queryset, False
+        return queryset.filter(found[0]), False
+
+    def get_ordering(self, request):
+        found = search.expressions(request.GET.get(SEARCH_VAR))
+        if found is None:
+            return super().get_ordering(request)
+        return [found[1].desc()]
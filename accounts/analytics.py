@@ -0,0 +1,114 @@
+# accounts/analytics.py
+"""
+Spending insights computed with NumPy over a customer's whole history.
+
+The completed history is fetched once as values_list() tuples and packed
+into column arrays (int64 epoch seconds, int64 cents, uint8 type codes,
+int64 counterparty ids); every metric is then a handful of vectorised
+array operations rather than a loop over model instances. Results are
+cached under the customer's latest history id and the local date, so they
+are recomputed only after new activity or when the day rolls over.
+
+Days are bucketed with today's UTC offset of TIME_ZONE, which is exact for
+zones without daylight saving time such as Africa/Nairobi.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import TransactionHistory
+
+TYPE_CODES = {tx_type: code for code, (tx_type, _) in enumerate(TransactionHistory.TRANSACTION_TYPES)}
+WITHDRAW, TRANSFER = TYPE_CODES['withdraw'], TYPE_CODES['transfer']
+DAY = 86400
+BURN_WINDOW_DAYS = 30
+TOP_COUNTERPARTIES = 5
+SPIKE_SIGMAS = 3
+MAX_SPIKES = 10
+
+COLUMNS = np.dtype([
+    ('timestamp', np.int64),
+    ('amount', np.int64),
+    ('type', np.uint8),
+    ('sender', np.int64),
+    ('receiver', np.int64),
+])
+
+
+def load_columns(user_id):
+    rows = (
+        TransactionHistory.objects.filter(user_id=user_id, status='completed')
+        .order_by()
+        .values_list('timestamp', 'amount', 'transaction_type', 'sender_id', 'receiver_id')
+    )
+    return np.fromiter(
+        ((int(ts.timestamp()), amount, TYPE_CODES[tx_type], sender or 0, receiver or 0)
+         for ts, amount, tx_type, sender, receiver in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)),
+        dtype=COLUMNS,
+    )
+
+
+def compute(user_id, columns, today):
+    """Metrics for one customer from load_columns() output, as of the local date today."""
+    offset = int(timezone.localtime().utcoffset().total_seconds())
+    days = (columns['timestamp'] + offset) // DAY
+    today_index = (int(timezone.now().timestamp()) + offset) // DAY
+
+    transfer = columns['type'] == TRANSFER
+    outgoing = transfer & (columns['sender'] == user_id)
+    spent = np.where((columns['type'] == WITHDRAW) | outgoing, columns['amount'], 0)
+
+    empty = columns.size == 0
+    first_day = today_index if empty else int(days.min())
+    daily_spend = np.bincount(days - first_day, weights=spent, minlength=today_index - first_day + 1).astype(np.int64)
+    active_days = daily_spend.size
+
+    burn = int(daily_spend[-BURN_WINDOW_DAYS:].sum())
+    spikes = []
+    if active_days > 1:
+        threshold = daily_spend.mean() + SPIKE_SIGMAS * daily_spend.std()
+        spike_days = np.flatnonzero((daily_spend > threshold) & (daily_spend > 0))[-MAX_SPIKES:]
+        spikes = [
+            {'date': today - timedelta(days=active_days - 1 - int(d)), 'amount': int(daily_spend[d])}
+            for d in spike_days[::-1]
+        ]
+
+    counterparty = np.where(outgoing, columns['receiver'], columns['sender'])
+    known = transfer & (counterparty > 0)  # 0: the other side's account was deleted
+    ids, inverse = np.unique(counterparty[known], return_inverse=True)
+    volume = np.bincount(inverse, weights=columns['amount'][known], minlength=ids.size).astype(np.int64)
+    counts = np.bincount(inverse, minlength=ids.size)
+    top = np.argsort(-volume, kind='stable')[:TOP_COUNTERPARTIES]
+    names = dict(User.objects.filter(pk__in=ids[top].tolist()).values_list('pk', 'username'))
+
+    return {
+        'transactions': int(columns.size),
+        'total_spent': int(spent.sum()),
+        'average_daily_spend': int(daily_spend.sum() // active_days),
+        'burn_rate_30d': burn // BURN_WINDOW_DAYS,
+        'spent_last_30d': burn,
+        'top_counterparties': [
+            {'username': names.get(int(ids[i])), 'total': int(volume[i]), 'count': int(counts[i])}
+            for i in top
+        ],
+        'spikes': spikes,
+    }
+
+
+def spending_insights(user_id):
+    """compute() for the customer, cached until their next history row or the next local day."""
+    last_id = (
+        TransactionHistory.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first()
+    )
+    today = timezone.localdate()
+    key = f"analytics:{user_id}:{last_id or 0}:{today.isoformat()}"
+    insights = cache.get(key)
+    if insights is None:
+        insights = compute(user_id, load_columns(user_id), today)
+        cache.set(key, insights, settings.ANALYTICS_CACHE_TTL)
+    return insights
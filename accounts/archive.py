@@ -0,0 +1,155 @@
+# accounts/archive.py
+"""
+Cold storage for transaction history: whole months older than
+HISTORY_ARCHIVE_HORIZON_DAYS move to gzip NDJSON parts in the private
+storage, indexed per block by HistoryArchive.
+"""
+
+import gzip
+import itertools
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import storages
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import filters
+
+from .models import HistoryArchive, TransactionHistory
+
+DIRECTORY = 'history_archive'
+FIELDS = (
+    'id', 'user_id', 'sender__username', 'receiver__username',
+    'transaction_type', 'status', 'amount', 'description', 'timestamp',
+)
+KEYS = ('id', 'user_id', 'sender', 'receiver', 'transaction_type', 'status', 'amount', 'description', 'timestamp')
+
+
+def cutoff_month(horizon_days=None, today=None):
+    """First day of the oldest local month that stays hot."""
+    horizon = settings.HISTORY_ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    return ((today or timezone.localdate()) - timedelta(days=horizon)).replace(day=1)
+
+
+def archive(horizon_days=None, batch_size=1000):
+    """Archive every month before cutoff_month(). Returns [(month, rows archived)]."""
+    cutoff = filters.local_midnight(cutoff_month(horizon_days))
+    archived, remaining = [], TransactionHistory.objects.filter(timestamp__lt=cutoff)
+    while oldest := remaining.order_by('timestamp', 'id').values_list('timestamp', flat=True).first():
+        month = timezone.localdate(oldest).replace(day=1)
+        archived.append((month, archive_month(month, batch_size)))
+        remaining = remaining.filter(timestamp__gte=filters.month_bounds(month.year, month.month)[1])
+    return archived
+
+
+def _delete(queryset, batch_size):
+    while ids := list(queryset.order_by('id').values_list('id', flat=True)[:batch_size]):
+        with transaction.atomic():
+            TransactionHistory.objects.filter(pk__in=ids).delete()
+
+
+def archive_month(month, batch_size=1000):
+    """Move the hot rows of one local month (given by its first day) into a new part."""
+    bounds = filters.month_bounds(month.year, month.month)
+    hot = filters.filter_range(TransactionHistory.objects.all(), 'timestamp', bounds)
+    # Every row of the month up to a stored part's last id is in that part.
+    stored = HistoryArchive.objects.filter(month=month).aggregate(last=Max('last_id'))['last']
+    if stored is not None:
+        _delete(hot.filter(id__lte=stored), batch_size)
+
+    rows = hot.order_by('user_id', 'timestamp', 'id').values_list(*FIELDS).iterator(chunk_size=batch_size)
+    blocks, count, first_id, last_id = [], 0, None, None
+    with tempfile.TemporaryFile() as data:
+        size = settings.HISTORY_ARCHIVE_BLOCK_ROWS
+        for block in iter(lambda: list(itertools.islice(rows, size)), []):
+            lines = []
+            for row in block:
+                record = dict(zip(KEYS, row))
+                record['timestamp'] = record['timestamp'].isoformat()
+                lines.append(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+                first_id = row[0] if first_id is None else min(first_id, row[0])
+                last_id = row[0] if last_id is None else max(last_id, row[0])
+            member = gzip.compress(b"".join(lines), mtime=0)
+            blocks.append([block[0][1], block[-1][1], data.tell(), len(member)])
+            data.write(member)
+            count += len(block)
+        if not count:
+            return 0
+        data.seek(0)
+        name = storages['private'].save(f"{DIRECTORY}/{month:%Y-%m}/part-{first_id}-{last_id}.ndjson.gz", File(data))
+
+    HistoryArchive.objects.create(month=month, name=name, rows=count, first_id=first_id, last_id=last_id, blocks=blocks)
+    _delete(hot.filter(id__lte=last_id), batch_size)
+    return count
+
+
+def parts(user_id, bounds=(None, None), newest_first=True):
+    """
+    [(part, [(offset, length), ...])] for the parts with blocks that may
+    hold the user's rows between bounds, ordered by month.
+    """
+    start, end = bounds
+    archives = HistoryArchive.objects.order_by('-month' if newest_first else 'month', 'first_id')
+    if start is not None:
+        archives = archives.filter(month__gte=timezone.localdate(start).replace(day=1))
+    if end is not None:
+        archives = archives.filter(month__lt=timezone.localdate(end))
+    found = []
+    for part in archives:
+        spans = [(offset, length) for first, last, offset, length in part.blocks if first <= user_id <= last]
+        if spans:
+            found.append((part, spans))
+    return found
+
+
+def _read(part, spans):
+    with storages['private'].open(part.name, 'rb') as data:
+        for offset, length in spans:
+            data.seek(offset)
+            yield from gzip.decompress(data.read(length)).splitlines()
+
+
+def user_rows(user_id, bounds=(None, None), transaction_type=None, min_amount=None, max_amount=None,
+              newest_first=True):
+    """
+    The user's archived rows as dicts (KEYS, timestamp parsed), filtered
+    like the hot history and ordered by (timestamp, id), newest first by
+    default. Rows are read one month at a time.
+    """
+    start, end = bounds
+    for _, month_parts in itertools.groupby(parts(user_id, bounds, newest_first), key=lambda found: found[0].month):
+        rows = []
+        for part, spans in month_parts:
+            for line in _read(part, spans):
+                row = json.loads(line)
+                if row['user_id'] != user_id:
+                    continue
+                row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+                if ((transaction_type and row['transaction_type'] != transaction_type)
+                        or (min_amount is not None and row['amount'] < min_amount)
+                        or (max_amount is not None and row['amount'] > max_amount)
+                        or (start is not None and row['timestamp'] < start)
+                        or (end is not None and row['timestamp'] >= end)):
+                    continue
+                rows.append(row)
+        rows.sort(key=lambda row: (row['timestamp'], row['id']), reverse=newest_first)
+        yield from rows
+
+
+def as_history_row(row):
+    """A user_rows() row in the shape of TransactionHistoryRowSerializer.values(), less user_username."""
+    return {
+        'id': row['id'],
+        'amount': row['amount'],
+        'transaction_type': row['transaction_type'],
+        'status': row['status'],
+        'description': row['description'],
+        'timestamp': row['timestamp'],
+        'sender_username': row['sender'],
+        'receiver_username': row['receiver'],
+    }
@@ -0,0 +1,161 @@
+# accounts/bulk.py
+
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import F
+
+from core import money
+
+from . import ledger, rollups, services, wallet_cache
+from .models import Wallet, TransactionHistory, Posting, BulkDisbursement, BulkDisbursementItem
+
+CSV_HEADERS = {'receiver_username', 'username', 'recipient'}
+
+
+def iter_json_rows(items):
+    """Yield (row_number, receiver_username, amount) from a JSON list of objects."""
+    for row_number, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            yield row_number, "", None
+            continue
+        yield row_number, str(item.get('receiver_username') or '').strip(), item.get('amount')
+
+
+def iter_csv_rows(uploaded_file):
+    """
+    Yield (row_number, receiver_username, amount) from an uploaded CSV one
+    line at a time, so the file is never held in memory. An optional header
+    row is skipped.
+    """
+    reader = csv.reader(io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline=''))
+    for row_number, row in enumerate(reader, start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if row_number == 1 and row[0].strip().lower() in CSV_HEADERS:
+            continue
+        yield row_number, row[0].strip(), row[1].strip() if len(row) > 1 else None
+
+
+def run_disbursement(sender, rows, chunk_size=None):
+    """
+    Pay every row from the sender's wallet, chunk by chunk. Each chunk is
+    one transaction: recipients are resolved in one query, wallets are
+    locked in user id order and balances, history, journal and item results
+    are written with bulk statements. Returns the BulkDisbursement.
+    """
+    chunk_size = chunk_size or settings.BULK_TRANSFER_CHUNK_SIZE
+    batch = BulkDisbursement.objects.create(user=sender)
+    rows = iter(rows)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            services.run_atomic(_apply_chunk, batch, sender, chunk)
+    except Exception:
+        BulkDisbursement.objects.filter(pk=batch.pk).update(status='failed')
+        raise
+    BulkDisbursement.objects.filter(pk=batch.pk).update(status='completed')
+    batch.refresh_from_db()
+    return batch
+
+
+def _apply_chunk(batch, sender, chunk):
+    results = []
+    valid = []
+    for row_number, username, raw_amount in chunk:
+        try:
+            amount = money.parse_amount(raw_amount)
+        except ValueError as e:
+            results.append(BulkDisbursementItem(
+                batch=batch, row_number=row_number, receiver_username=username, status='failed', detail=str(e)
+            ))
+            continue
+        if not username:
+            detail = "Missing receiver username."
+        elif username == sender.username:
+            detail = "Cannot transfer to yourself."
+        else:
+            valid.append((row_number, username, amount))
+            continue
+        results.append(BulkDisbursementItem(
+            batch=batch, row_number=row_number, receiver_username=username, amount=amount,
+            status='failed', detail=detail
+        ))
+
+    recipients = dict(User.objects.filter(username__in={u for _, u, _ in valid}).values_list('username', 'id'))
+    wallets = {
+        wallet.user_id: wallet
+        for wallet in Wallet.objects.select_for_update()
+        .filter(user_id__in={sender.pk, *recipients.values()})
+        .order_by('user_id')
+        .only('id', 'user_id', 'balance', 'version', 'is_active', 'is_frozen', 'shard_count')
+    }
+    sender_wallet = wallets.get(sender.pk)
+    if sender_wallet is None:
+        raise Wallet.DoesNotExist
+    if sender_wallet.shard_count and services.fold_shards(sender_wallet.pk):
+        sender_wallet.refresh_from_db(fields=['balance'])
+
+    available = sender_wallet.balance if sender_wallet.is_active and not sender_wallet.is_frozen else 0
+    changed = {sender_wallet.pk: sender_wallet}
+    history = []
+    entries = []
+    paid = 0
+    for row_number, username, amount in valid:
+        receiver_id = recipients.get(username)
+        receiver_wallet = wallets.get(receiver_id)
+        if receiver_id is None:
+            detail = "Receiver not found."
+        elif receiver_wallet is None:
+            detail = "Wallet not found."
+        elif amount > available:
+            detail = "Insufficient funds or wallet is frozen."
+        else:
+            available -= amount
+            paid += amount
+            receiver_wallet.balance += amount
+            changed[receiver_wallet.pk] = receiver_wallet
+            history += [
+                TransactionHistory(
+                    user=sender, sender=sender, receiver_id=receiver_id,
+                    amount=amount, transaction_type="transfer", status="completed",
+                    description=f"Bulk transfer to {username}"
+                ),
+                TransactionHistory(
+                    user_id=receiver_id, sender=sender, receiver_id=receiver_id,
+                    amount=amount, transaction_type="transfer", status="completed",
+                    description=f"Received from {sender.username}"
+                ),
+            ]
+            entries.append(("transfer", f"{sender.username} to {username} (bulk #{batch.pk})", [
+                (Posting.WALLET_ACCOUNT, sender.pk, -amount),
+                (Posting.WALLET_ACCOUNT, receiver_id, amount),
+            ]))
+            results.append(BulkDisbursementItem(
+                batch=batch, row_number=row_number, receiver_username=username, amount=amount, status='completed'
+            ))
+            continue
+        results.append(BulkDisbursementItem(
+            batch=batch, row_number=row_number, receiver_username=username, amount=amount,
+            status='failed', detail=detail
+        ))
+
+    if entries:
+        sender_wallet.balance -= paid
+        for wallet in changed.values():
+            wallet.version += 1
+        Wallet.objects.bulk_update(list(changed.values()), ['balance', 'version'])
+        wallet_cache.publish({w.user_id: (w.version, w.shard_count) for w in changed.values()})
+        rollups.record(TransactionHistory.objects.bulk_create(history))
+        ledger.post_entries(entries)
+
+    BulkDisbursementItem.objects.bulk_create(results)
+    succeeded = len(entries)
+    BulkDisbursement.objects.filter(pk=batch.pk).update(
+        total_items=F('total_items') + len(results),
+        succeeded=F('succeeded') + succeeded,
+        failed=F('failed') + len(results) - succeeded,
+        total_amount=F('total_amount') + paid,
+    )
@@ -0,0 +1,83 @@
+# accounts/exports.py
+"""
+Streaming transaction history exports. Rows are read as values_list()
+tuples through a server-side cursor and encoded line by line, so memory
+stays flat however many years of history come out.
+"""
+
+import csv
+import json
+import zlib
+
+from core.money import format_cents
+
+COLUMNS = ('id', 'timestamp', 'transaction_type', 'status', 'amount', 'sender', 'receiver', 'description')
+FLUSH_BYTES = 64 * 1024
+
+
+def history_rows(queryset, chunk_size):
+    return queryset.order_by('timestamp', 'id').values_list(
+        'id', 'timestamp', 'transaction_type', 'status', 'amount',
+        'sender__username', 'receiver__username', 'description',
+    ).iterator(chunk_size=chunk_size)
+
+
+def archived_rows(rows):
+    """history_rows() tuples for accounts.archive.user_rows() dicts."""
+    for row in rows:
+        yield (row['id'], row['timestamp'], row['transaction_type'], row['status'], row['amount'],
+               row['sender'], row['receiver'], row['description'])
+
+
+def _format(row):
+    pk, timestamp, tx_type, status, amount, sender, receiver, description = row
+    return pk, timestamp.isoformat(), tx_type, status, format_cents(amount), sender, receiver, description
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(_format(row))
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, _format(row)))) + "\n"
+
+
+def encode(lines, compress=False):
+    """
+    Turn text lines into response chunks of about FLUSH_BYTES, gzip-compressed
+    if asked. The first line is sent on its own so the client gets a byte
+    before the first batch of rows is read.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def emit(data, final=False):
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    buffer, size, first = [], 0, True
+    for line in lines:
+        data = line.encode()
+        if first:
+            yield emit(data)
+            first = False
+            continue
+        buffer.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            yield emit(b"".join(buffer))
+            buffer, size = [], 0
+    tail = emit(b"".join(buffer), final=True)
+    if tail:
+        yield tail
@@ -0,0 +1,19 @@
+# accounts/hashers.py
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TransferPinHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 for 4-digit transfer PINs with its own, tunable work factor
+    (TRANSFER_PIN_HASH_ITERATIONS). A 10,000-value PIN space gains little
+    from a login-grade iteration count; attempts are what must be limited.
+    PINs stored with another hasher or iteration count are re-hashed the
+    next time they verify.
+    """
+    algorithm = "pbkdf2_pin"
+
+    @property
+    def iterations(self):
+        return settings.TRANSFER_PIN_HASH_ITERATIONS
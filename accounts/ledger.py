@@ -0,0 +1,126 @@
+# accounts/ledger.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Max, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Wallet, JournalEntry, Posting, BalanceSnapshot
+
+
+def post_entry(entry_type, description, legs):
+    """
+    Append one journal entry. legs is a list of (account, user_id, amount)
+    tuples with signed amounts that must sum to zero; user_id is only used
+    for wallet legs. Must run inside the transaction that moves the balance.
+    """
+    if sum(amount for _, _, amount in legs) != 0:
+        raise ValueError("Journal entry legs must balance.")
+
+    user_ids = {user_id for account, user_id, _ in legs if account == Posting.WALLET_ACCOUNT}
+    wallets = dict(Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+
+    entry = JournalEntry.objects.create(entry_type=entry_type, description=description[:255])
+    Posting.objects.bulk_create([
+        Posting(entry=entry, account=account, wallet_id=wallets.get(user_id) if account == Posting.WALLET_ACCOUNT else None,
+                amount=amount)
+        for account, user_id, amount in legs
+    ])
+    for wallet_id in wallets.values():
+        _maybe_snapshot(wallet_id)
+    return entry
+
+
+def post_entries(entries, batch_size=1000):
+    """
+    Bulk variant of post_entry for batches: entries is a list of
+    (entry_type, description, legs). Wallet ids are resolved in one query and
+    entries and postings are written with bulk inserts. Snapshot checks are
+    left to the wallets' next single posting or the daily snapshot run.
+    """
+    for _, _, legs in entries:
+        if sum(amount for _, _, amount in legs) != 0:
+            raise ValueError("Journal entry legs must balance.")
+
+    user_ids = {
+        user_id for _, _, legs in entries for account, user_id, _ in legs if account == Posting.WALLET_ACCOUNT
+    }
+    wallets = dict(Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+
+    created = JournalEntry.objects.bulk_create(
+        [JournalEntry(entry_type=entry_type, description=description[:255]) for entry_type, description, _ in entries],
+        batch_size=batch_size,
+    )
+    Posting.objects.bulk_create([
+        Posting(entry=entry, account=account, wallet_id=wallets.get(user_id) if account == Posting.WALLET_ACCOUNT else None,
+                amount=amount)
+        for entry, (_, _, legs) in zip(created, entries)
+        for account, user_id, amount in legs
+    ], batch_size=batch_size)
+    return created
+
+
+def _latest_snapshot(wallet_id, at=None):
+    snapshots = BalanceSnapshot.objects.filter(wallet_id=wallet_id)
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    return snapshots.order_by('-last_posting_id').values('last_posting_id', 'balance', 'taken_at').first()
+
+
+def _maybe_snapshot(wallet_id):
+    """
+    Snapshot a wallet once LEDGER_SNAPSHOT_EVERY postings have accumulated
+    since its last snapshot. Only wallets serialised by their row lock are
+    snapshotted here; hot (sharded) wallets are left to take_snapshot runs,
+    which only look at settled postings.
+    """
+    every = settings.LEDGER_SNAPSHOT_EVERY
+    last_id = Subquery(
+        BalanceSnapshot.objects.filter(wallet_id=wallet_id).order_by('-last_posting_id').values('last_posting_id')[:1]
+    )
+    since = Posting.objects.filter(wallet_id=wallet_id, id__gt=Coalesce(last_id, 0))
+    if since[:every].count() < every:
+        return
+    if Wallet.objects.filter(pk=wallet_id, shard_count=0).exists():
+        take_snapshot(wallet_id)
+
+
+def take_snapshot(wallet_id, settle=timedelta(0)):
+    """
+    Record the journal balance of a wallet as of its newest posting older
+    than `settle`. Costs one snapshot lookup plus a sum over the postings
+    since that snapshot.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        last = _latest_snapshot(wallet_id)
+        start = last['last_posting_id'] if last else 0
+        tail = Posting.objects.filter(wallet_id=wallet_id, id__gt=start, created_at__lte=now - settle)
+        totals = tail.aggregate(total=Sum('amount'), last_id=Max('id'))
+        if totals['last_id'] is None:
+            return None
+        return BalanceSnapshot.objects.create(
+            wallet_id=wallet_id,
+            last_posting_id=totals['last_id'],
+            balance=(last['balance'] if last else 0) + totals['total'],
+            taken_at=now,
+        )
+
+
+def balance_at(wallet_id, at=None):
+    """
+    Journal balance of a wallet at a point in time (default: now): the
+    latest snapshot taken at or before `at` plus postings after it.
+    Wallets created before the journal start from their opening snapshot.
+    """
+    at = at or timezone.now()
+    snapshot = _latest_snapshot(wallet_id, at)
+    tail = Posting.objects.filter(
+        wallet_id=wallet_id,
+        id__gt=snapshot['last_posting_id'] if snapshot else 0,
+        created_at__lte=at,
+    ).aggregate(total=Sum('amount'))['total']
+    return (snapshot['balance'] if snapshot else 0) + (tail or 0)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts import archive
+
+
+class Command(BaseCommand):
+    help = "Move transaction history older than the archive horizon into compressed monthly archive files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, help="Defaults to HISTORY_ARCHIVE_HORIZON_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Hot rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        archived = archive.archive(options['horizon_days'], options['batch_size'])
+        for month, rows in archived:
+            self.stdout.write(f"{month:%Y-%m}: archived {rows} row(s)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {sum(rows for _, rows in archived)} row(s)."))
@@ -0,0 +1,123 @@
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from accounts import services
+from accounts.models import TransactionHistory
+
+PIN = '1234'
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive wallet/transfer/ and wallet/history/ through the full request stack from concurrent clients "
+        "and report p50/p99 latency and throughput. Runs against a fresh, seeded test database of the "
+        "configured engine (PostgreSQL needs CREATEDB); --engines sqlite,postgresql runs once per engine "
+        "with DB_ENGINE set, for a side-by-side comparison."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', help="Comma-separated DB_ENGINE values to compare, each in a subprocess.")
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--history-rows', type=int, default=500, help="History rows seeded per user.")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help="Requests per thread and endpoint.")
+        parser.add_argument('--seed', type=int, default=360)
+
+    def handle(self, *args, **options):
+        if options['engines']:
+            return self.compare(options)
+
+        if connection.vendor == 'sqlite':
+            # A file, not the in-memory test database, so threads contend for its write lock as in production.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'smartbank_bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(DATABASE_REPLICA_READS=False, ALLOWED_HOSTS=['localhost']):
+                users = self.seed(options)
+                for endpoint in ('transfer', 'history'):
+                    self.report(endpoint, *self.run(endpoint, users, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def compare(self, options):
+        argv = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_endpoints']
+        for name in ('users', 'history_rows', 'threads', 'requests', 'seed'):
+            argv += [f"--{name.replace('_', '-')}", str(options[name])]
+        for engine in options['engines'].split(','):
+            result = subprocess.run(argv, env={**os.environ, 'DB_ENGINE': engine}, capture_output=True, text=True)
+            self.stdout.write(result.stdout, ending='')
+            if result.returncode:
+                self.stderr.write(f"{engine}: {result.stderr.strip().splitlines()[-1]}")
+
+    def seed(self, options):
+        users = [User.objects.create(username=f"bench-{i}") for i in range(options['users'])]
+        rng = random.Random(options['seed'])
+        for user in users:
+            user.profile.set_transfer_pin(PIN)
+            services.top_up(user, 1_000_000_00)
+            TransactionHistory.objects.bulk_create(
+                TransactionHistory(user=user, transaction_type='top_up', amount=rng.randint(1_00, 500_00),
+                                   status='completed', description="Seeded")
+                for _ in range(options['history_rows'])
+            )
+        return users
+
+    def run(self, endpoint, users, options):
+        latencies, errors, lock = [], [], threading.Lock()
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            user = users[index % len(users)]
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(user)
+            token = None
+            if endpoint == 'transfer':
+                response = client.post('/api/accounts/wallet/authorize/', {'pin': PIN}, format='json')
+                token = response.json()['transfer_token']
+            timings, failed = [], 0
+            try:
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    if endpoint == 'transfer':
+                        receiver = rng.choice([u for u in users if u != user])
+                        response = client.post('/api/accounts/wallet/transfer/', {
+                            'receiver_username': receiver.username, 'amount': '1.00', 'transfer_token': token,
+                        }, format='json')
+                    else:
+                        response = client.get('/api/accounts/wallet/history/?page_size=50')
+                    timings.append(time.perf_counter() - started)
+                    failed += response.status_code != 200
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(timings)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies, sum(errors), time.perf_counter() - started
+
+    def report(self, endpoint, latencies, errors, elapsed):
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{connection.vendor:<10} {endpoint:<8} {len(latencies):6d} req  "
+            f"p50 {percentiles[49] * 1000:8.2f} ms  p99 {percentiles[98] * 1000:8.2f} ms  "
+            f"{len(latencies) / elapsed:8.1f} req/s  {errors} error(s)"
+        )
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts import services
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent credits into a single merchant wallet for several shard counts. "
+        "Run it against PostgreSQL: SQLite serialises all writers, so shards cannot help there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', default='0,2,4,8,16', help="Comma-separated shard counts (0 = plain wallet).")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--credits', type=int, default=200, help="Credits per thread.")
+
+    def handle(self, *args, **options):
+        merchant = User.objects.create(username=f"bench-merchant-{time.time_ns()}")
+        wallet = Wallet.objects.get(user=merchant)
+        try:
+            for shard_count in [int(n) for n in options['shards'].split(',')]:
+                if shard_count:
+                    services.enable_sharding(wallet, shard_count)
+                else:
+                    services.disable_sharding(wallet)
+                rate = self.run_round(merchant.pk, options['threads'], options['credits'])
+                self.stdout.write(f"shards={shard_count:<3} {rate:10.0f} credits/sec")
+        finally:
+            merchant.delete()
+
+    def run_round(self, user_id, threads, credits):
+        def worker():
+            try:
+                for _ in range(credits):
+                    services.run_atomic(services.credit, user_id, 100)
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return threads * credits / (time.perf_counter() - started)
@@ -0,0 +1,65 @@
+import resource
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import TransactionHistory
+from core import filters
+from core.pdf_utils import generate_statement_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the statement renderer on statements of increasing size: time per 10k rows, "
+        "peak traced Python memory and peak RSS growth, which should stay flat as rows grow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='10000,50000', help="Comma-separated statement sizes.")
+
+    def handle(self, *args, **options):
+        sizes = [int(n) for n in options['rows'].split(',')]
+        today = timezone.localdate()
+        customer = User.objects.create(username=f"bench-statement-{time.time_ns()}")
+        try:
+            written = 0
+            for size in sizes:
+                TransactionHistory.objects.bulk_create(
+                    TransactionHistory(user=customer, transaction_type='top_up', amount=100_00 + i)
+                    for i in range(written, size)
+                )
+                written = max(written, size)
+                rows = filters.filter_range(
+                    TransactionHistory.objects.filter(user=customer), 'timestamp',
+                    filters.month_bounds(today.year, today.month),
+                ).order_by('timestamp', 'id')[:size]
+                self.report(customer, rows, today, size)
+        finally:
+            TransactionHistory.objects.filter(user=customer).delete()
+            customer.delete()
+
+    def report(self, customer, rows, today, size):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        with generate_statement_pdf(customer, rows, today.month, today.year) as pdf:
+            elapsed = time.perf_counter() - started
+            pdf_bytes = pdf.seek(0, 2)
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before  # KiB on Linux
+
+        # A second, traced run: tracemalloc slows rendering too much to time it.
+        tracemalloc.start()
+        generate_statement_pdf(customer, rows, today.month, today.year).close()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        per_10k = 10_000 / size
+        self.stdout.write(
+            f"rows={size:<7} {elapsed * per_10k:5.2f}s/10k rows  "
+            f"traced peak {traced_peak / 2**20:5.1f} MiB  "
+            f"max RSS growth {rss_growth / 1024:5.1f} MiB  "
+            f"pdf {pdf_bytes / 2**20:.1f} MiB on {connection.vendor}"
+        )
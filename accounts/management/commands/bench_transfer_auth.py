@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure CPU time per wallet/transfer/ request when authorizing with the raw PIN "
+        "versus a transfer_token from wallet/authorize/. Runs in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            sender = User.objects.create(username=f"bench-sender-{time.time_ns()}")
+            receiver = User.objects.create(username=f"bench-receiver-{time.time_ns()}")
+            sender.profile.set_transfer_pin('1234')
+            Wallet.objects.filter(user=sender).update(balance=1_000_000_00)
+
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(sender)
+            token = client.post('/api/accounts/wallet/authorize/', {'pin': '1234'}, format='json').json()['transfer_token']
+
+            for label, credentials in (("pin", {'pin': '1234'}), ("token", {'transfer_token': token})):
+                per_request = self.measure(client, receiver.username, credentials, options['requests'])
+                self.stdout.write(f"{label:<6} {per_request * 1000:8.2f} ms CPU per transfer")
+
+            transaction.set_rollback(True)
+
+    def measure(self, client, receiver_username, credentials, requests):
+        payload = {'receiver_username': receiver_username, 'amount': '1.00', **credentials}
+        started = time.process_time()
+        for _ in range(requests):
+            response = client.post('/api/accounts/wallet/transfer/', payload, format='json')
+            if response.status_code != 200:
+                raise RuntimeError(f"Transfer failed: {response.status_code} {response.content!r}")
+        return (time.process_time() - started) / requests
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Wallet
+from accounts.services import fold_shards
+
+
+class Command(BaseCommand):
+    help = "Fold hot-wallet shard balances back into Wallet.balance. Meant to run periodically (e.g. from cron)."
+
+    def handle(self, *args, **options):
+        folded_wallets = 0
+        for wallet_id in Wallet.objects.filter(shard_count__gt=0).values_list('pk', flat=True).iterator():
+            if fold_shards(wallet_id):
+                folded_wallets += 1
+        self.stdout.write(self.style.SUCCESS(f"Folded shards for {folded_wallets} hot wallet(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily wallet rollups from transaction history, in a single transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
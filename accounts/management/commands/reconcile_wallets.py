@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.ledger import balance_at
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = "Compare every wallet balance against its journal balance (latest snapshot plus postings since)."
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for wallet in Wallet.objects.select_related('user').iterator():
+            expected = balance_at(wallet.pk)
+            if expected != wallet.total_balance:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{wallet}: wallet balance {wallet.total_balance} != journal balance {expected}"
+                ))
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} wallet(s) out of balance."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All wallets reconcile with the journal."))
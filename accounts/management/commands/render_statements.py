@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts import statements
+from accounts.models import TransactionHistory
+from core import filters
+
+
+class Command(BaseCommand):
+    help = "Render and store the PDF statement of every customer with activity in a month. Run at month close."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help="Defaults to the month that just closed.")
+        parser.add_argument('--month', type=int)
+
+    def handle(self, *args, **options):
+        if options['year'] is None or options['month'] is None:
+            this_month = timezone.localdate().replace(day=1)
+            last_month = date.fromordinal(this_month.toordinal() - 1)
+            year, month = last_month.year, last_month.month
+        else:
+            year, month = options['year'], options['month']
+        try:
+            bounds = filters.month_bounds(year, month)
+        except ValueError as e:
+            raise CommandError(e)
+
+        user_ids = filters.filter_range(TransactionHistory.objects.all(), 'timestamp', bounds).values('user_id')
+        rendered = 0
+        for user in User.objects.filter(pk__in=user_ids).only('pk', 'username').iterator():
+            if statements.render(user, year, month):
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} statement(s) for {month:02d}/{year}."))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.ledger import take_snapshot
+from accounts.models import Posting
+
+
+class Command(BaseCommand):
+    help = "Snapshot the journal balance of every wallet that had postings in the last day. Run once a day."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settle-seconds', type=int, default=60,
+                            help="Ignore postings younger than this, so in-flight transactions are not skipped.")
+
+    def handle(self, *args, **options):
+        settle = timedelta(seconds=options['settle_seconds'])
+        since = timezone.now() - timedelta(days=1)
+        wallet_ids = (
+            Posting.objects.filter(created_at__gte=since, wallet__isnull=False)
+            .values_list('wallet_id', flat=True).distinct()
+        )
+        taken = sum(1 for wallet_id in wallet_ids.iterator() if take_snapshot(wallet_id, settle=settle))
+        self.stdout.write(self.style.SUCCESS(f"Took {taken} balance snapshot(s)."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_wallet_balance_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='shard_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WalletShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='accounts.wallet')),
+            ],
+            options={
+                'ordering': ['wallet', 'index'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'index'), name='unique_wallet_shard_index'), models.CheckConstraint(condition=models.Q(('balance__gte', 0)), name='wallet_shard_balance_non_negative')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def seed_opening_snapshots(apps, schema_editor):
+    # Balances that predate the journal become each wallet's opening snapshot.
+    Wallet = apps.get_model('accounts', 'Wallet')
+    BalanceSnapshot = apps.get_model('accounts', 'BalanceSnapshot')
+    now = timezone.now()
+    snapshots = []
+    for wallet in Wallet.objects.annotate(unfolded=Sum('shards__balance')).iterator():
+        balance = wallet.balance + (wallet.unfolded or 0)
+        snapshots.append(BalanceSnapshot(wallet_id=wallet.pk, last_posting_id=0, balance=balance, taken_at=now))
+    BalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_wallet_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('transfer', 'Transfer'), ('top_up', 'Top-Up'), ('withdraw', 'Withdraw'), ('mpesa_deposit', 'M-Pesa Deposit'), ('loan_disbursement', 'Loan Disbursement'), ('loan_repayment', 'Loan Repayment')], max_length=20)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Journal entries',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_posting_id', models.BigIntegerField(default=0)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('taken_at', models.DateTimeField()),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='accounts.wallet')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['wallet', '-last_posting_id'], name='snapshot_wallet_posting_idx'), models.Index(fields=['wallet', '-taken_at'], name='snapshot_wallet_taken_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(choices=[('wallet', 'Customer Wallet'), ('cash', 'Cash In/Out'), ('mpesa', 'M-Pesa Clearing'), ('loans', 'Loan Book')], default='wallet', max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='accounts.journalentry')),
+                ('wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='accounts.wallet')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['wallet', 'id'], name='posting_wallet_id_idx'), models.Index(fields=['wallet', 'created_at'], name='posting_wallet_created_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:52
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# Amounts move from DecimalField to integer cents: widen the decimal columns so
+# scaling can't overflow them, multiply every value by 100, then switch the
+# columns to bigint.
+MONEY_FIELDS = [
+    ('wallet', 'balance'),
+    ('walletshard', 'balance'),
+    ('transaction', 'amount'),
+    ('transactionhistory', 'amount'),
+    ('posting', 'amount'),
+    ('balancesnapshot', 'balance'),
+    ('bulkdisbursement', 'total_amount'),
+    ('bulkdisbursementitem', 'amount'),
+]
+
+
+def decimal_to_cents(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('accounts', model_name).objects.update(**{field: Round(F(field) * 100)})
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('accounts', model_name).objects.update(**{field: F(field) * Decimal('0.01')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_bulk_disbursement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletshard',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='transactionhistory',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='posting',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='balancesnapshot',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='bulkdisbursement',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='bulkdisbursementitem',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletshard',
+            name='balance',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='transactionhistory',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='posting',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='balancesnapshot',
+            name='balance',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='bulkdisbursement',
+            name='total_amount',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='bulkdisbursementitem',
+            name='amount',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Full-text search index over transaction history (see accounts.search).
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE accounts_history_fts USING fts5(owner, counterparties, description, tokenize='unicode61')",
+    """
+    CREATE TRIGGER accounts_history_fts_insert AFTER INSERT ON accounts_transactionhistory BEGIN
+        INSERT INTO accounts_history_fts (rowid, owner, counterparties, description) VALUES (
+            new.id,
+            'u' || new.user_id,
+            coalesce((SELECT username FROM auth_user WHERE id = new.sender_id), '') || ' ' ||
+            coalesce((SELECT username FROM auth_user WHERE id = new.receiver_id), ''),
+            coalesce(new.description, '')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_history_fts_delete AFTER DELETE ON accounts_transactionhistory BEGIN
+        DELETE FROM accounts_history_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO accounts_history_fts (rowid, owner, counterparties, description)
+    SELECT h.id, 'u' || h.user_id, coalesce(s.username, '') || ' ' || coalesce(r.username, ''), coalesce(h.description, '')
+    FROM accounts_transactionhistory h
+    LEFT JOIN auth_user s ON s.id = h.sender_id
+    LEFT JOIN auth_user r ON r.id = h.receiver_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS accounts_history_fts_delete",
+    "DROP TRIGGER IF EXISTS accounts_history_fts_insert",
+    "DROP TABLE IF EXISTS accounts_history_fts",
+]
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('simple',
+        coalesce((SELECT username FROM auth_user WHERE id = {row}.sender_id), '') || ' ' ||
+        coalesce((SELECT username FROM auth_user WHERE id = {row}.receiver_id), '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.description, '')), 'B')
+"""
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE accounts_transactionhistory ADD COLUMN search_document tsvector",
+    f"""
+    CREATE FUNCTION accounts_history_search_document() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_document := {POSTGRES_DOCUMENT.format(row='NEW')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER accounts_history_search_document
+    BEFORE INSERT OR UPDATE OF sender_id, receiver_id, description ON accounts_transactionhistory
+    FOR EACH ROW EXECUTE FUNCTION accounts_history_search_document()
+    """,
+    f"UPDATE accounts_transactionhistory h SET search_document = {POSTGRES_DOCUMENT.format(row='h')}",
+    "CREATE INDEX history_search_gin_idx ON accounts_transactionhistory USING GIN (search_document)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS accounts_history_search_document ON accounts_transactionhistory",
+    "DROP FUNCTION IF EXISTS accounts_history_search_document()",
+    "ALTER TABLE accounts_transactionhistory DROP COLUMN IF EXISTS search_document",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_daily_wallet_rollup'),
+        # The triggers read auth_user, which SQLite won't let later auth migrations rebuild around them.
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
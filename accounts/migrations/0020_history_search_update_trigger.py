@@ -0,0 +1,43 @@
+# Keep the SQLite search index current when a history row is edited, as the
+# PostgreSQL trigger from 0017_history_search already does.
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER accounts_history_fts_update
+    AFTER UPDATE OF user_id, sender_id, receiver_id, description ON accounts_transactionhistory BEGIN
+        DELETE FROM accounts_history_fts WHERE rowid = old.id;
+        INSERT INTO accounts_history_fts (rowid, owner, counterparties, description) VALUES (
+            new.id,
+            'u' || new.user_id,
+            coalesce((SELECT username FROM auth_user WHERE id = new.sender_id), '') || ' ' ||
+            coalesce((SELECT username FROM auth_user WHERE id = new.receiver_id), ''),
+            coalesce(new.description, '')
+        );
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS accounts_history_fts_update",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_history_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(SQLITE_FORWARD), _run(SQLITE_BACKWARD)),
+    ]
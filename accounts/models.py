@@ -2,11 +2,14 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.exceptions import ValidationError
-import uuid
 import re
 
+from core.models import DirtyFieldsMixin
+from core.money import format_cents, format_kes
+from .hashers import TransferPinHasher
 
-class Profile(models.Model):
+
+class Profile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     id_number = models.CharField(max_length=20, blank=True, null=True, unique=True)
     phone = models.CharField(max_length=15, blank=True, null=True)
@@ -22,34 +25,92 @@ class Profile(models.Model):
     def set_transfer_pin(self, raw_pin):
         if not re.fullmatch(r'\d{4}', raw_pin):
             raise ValidationError("Transfer PIN must be exactly 4 digits.")
-        self.transfer_pin = make_password(raw_pin)
-        self.save()
+        self.transfer_pin = make_password(raw_pin, hasher=TransferPinHasher.algorithm)
+        self.save(update_fields=['transfer_pin'])
 
     def check_transfer_pin(self, raw_pin):
-        return check_password(raw_pin, self.transfer_pin)
+        def rehash(raw_pin):
+            self.transfer_pin = make_password(raw_pin, hasher=TransferPinHasher.algorithm)
+            self.save(update_fields=['transfer_pin'])
+
+        return check_password(raw_pin, self.transfer_pin, setter=rehash, preferred=TransferPinHasher.algorithm)
 
 
-class Wallet(models.Model):
+class Wallet(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet')
     account_number = models.CharField(max_length=12, unique=True, editable=False)
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    balance = models.BigIntegerField(default=0)  # cents
     is_active = models.BooleanField(default=True)
     is_frozen = models.BooleanField(default=False)
+    # Hot-wallet mode: when > 0, credits land on one of this many WalletShard rows
+    # instead of contending for this row's lock.
+    shard_count = models.PositiveSmallIntegerField(default=0)
+    # Bumped by every balance mutation; keys the cached wallet read model (accounts.wallet_cache).
+    version = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @staticmethod
+    def new_account_number():
+        from .account_numbers import allocate
+        return allocate()[0]
+
     def save(self, *args, **kwargs):
-        if self.balance < 0:
-            raise ValidationError("Wallet balance cannot be negative.")
         if not self.account_number:
-            self.account_number = str(uuid.uuid4().int)[:12]
+            self.account_number = self.new_account_number()
         super().save(*args, **kwargs)
 
+    @property
+    def total_balance(self):
+        """Folded balance plus any credits still sitting on shards."""
+        if not self.shard_count:
+            return self.balance
+        unfolded = self.shards.aggregate(total=models.Sum('balance'))['total']
+        return self.balance + (unfolded or 0)
+
     def can_withdraw(self, amount):
-        return self.is_active and not self.is_frozen and self.balance >= amount
+        return self.is_active and not self.is_frozen and self.total_balance >= amount
 
     def __str__(self):
         return f"{self.user.username} - {self.account_number}"
 
+    class Meta:
+        constraints = [
+            # Enforced by the database so concurrent guarded UPDATEs can never
+            # drive a balance below zero (see accounts.services).
+            models.CheckConstraint(condition=models.Q(balance__gte=0), name='wallet_balance_non_negative'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='wallet_created_idx'),  # admin date hierarchy
+        ]
+
+
+class AccountNumberSequence(models.Model):
+    """
+    Counter behind account number allocation on backends without native
+    sequences (see accounts.account_numbers). Holds a single row.
+    """
+    next_value = models.PositiveBigIntegerField(default=1)
+
+
+class WalletShard(models.Model):
+    """
+    A sub-balance of a hot wallet. Shard balances are periodically folded
+    back into Wallet.balance (see accounts.services.fold_shards).
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    balance = models.BigIntegerField(default=0)  # cents
+
+    def __str__(self):
+        return f"{self.wallet.account_number} shard {self.index}"
+
+    class Meta:
+        ordering = ['wallet', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'index'], name='unique_wallet_shard_index'),
+            models.CheckConstraint(condition=models.Q(balance__gte=0), name='wallet_shard_balance_non_negative'),
+        ]
+
 
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
@@ -69,12 +130,12 @@ class Transaction(models.Model):
         null=True, blank=True
     )
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.BigIntegerField()  # cents
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
-        return f"{self.transaction_type.upper()} - KSh {self.amount}"
+        return f"{self.transaction_type.upper()} - {format_kes(self.amount)}"
 
     class Meta:
         ordering = ['-timestamp']
@@ -98,12 +159,233 @@ class TransactionHistory(models.Model):
     receiver = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='history_received')
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='completed')
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.BigIntegerField()  # cents
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
-        return f"{self.transaction_type.upper()} | {self.user.username} | KSh {self.amount} | {self.status}"
+        return f"{self.transaction_type.upper()} | {self.user.username} | {format_kes(self.amount)} | {self.status}"
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Keyset pagination and date ranges: (timestamp, id) per user; also serves (user, timestamp).
+            models.Index(fields=['user', 'timestamp', 'id'], name='history_user_ts_id_idx'),
+            models.Index(fields=['user', 'transaction_type', 'timestamp'], name='history_user_type_ts_idx'),
+            models.Index(fields=['timestamp', 'id'], name='history_ts_id_idx'),
+        ]
+
+
+class DailyWalletRollup(models.Model):
+    """
+    Per-customer daily count, sum, min and max of completed history rows by
+    type and direction, upserted by accounts.rollups in the same transaction
+    as each history insert. A busy day's rows are spread over
+    DAILY_ROLLUP_SLOTS slots so concurrent inserts for one customer (say, a
+    hot merchant wallet) don't queue on a single row; readers sum the slots.
+    """
+    DIRECTIONS = (
+        ('in', 'In'),
+        ('out', 'Out'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()  # local (TIME_ZONE) date
+    transaction_type = models.CharField(max_length=10, choices=TransactionHistory.TRANSACTION_TYPES)
+    direction = models.CharField(max_length=3, choices=DIRECTIONS)
+    slot = models.PositiveSmallIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    total = models.BigIntegerField(default=0)  # cents
+    min_amount = models.BigIntegerField()  # cents
+    max_amount = models.BigIntegerField()  # cents
+
+    def __str__(self):
+        return f"{self.user.username} {self.date} {self.transaction_type}/{self.direction}: {self.count} x {format_kes(self.total)}"
+
+    class Meta:
+        constraints = [
+            # Also the (user, date) range index the chart endpoint reads.
+            models.UniqueConstraint(
+                fields=['user', 'date', 'transaction_type', 'direction', 'slot'], name='unique_daily_rollup'
+            ),
+        ]
+
+
+class HistoryArchive(models.Model):
+    """
+    A part of one month's TransactionHistory moved out of the hot table
+    into a gzip NDJSON file in the private storage (see accounts.archive).
+    Rows are sorted by (user, timestamp, id) and compressed in blocks, each
+    its own gzip member; `blocks` is the sparse index over them.
+    """
+    month = models.DateField()  # first day of the local month
+    name = models.CharField(max_length=255)  # private storage path
+    rows = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    # [[first user id, last user id, byte offset, byte length], ...] per block.
+    blocks = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.rows} rows in {self.name}"
+
+    class Meta:
+        ordering = ['-month', 'first_id']
+        indexes = [
+            models.Index(fields=['month'], name='history_archive_month_idx'),
+        ]
+
+
+class ImmutableQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise ValidationError("Journal records are append-only.")
+
+    def delete(self):
+        raise ValidationError("Journal records are append-only.")
+
+
+class JournalEntry(models.Model):
+    """
+    One money movement. Its postings always sum to zero: one debit leg and
+    one credit leg, written in the same transaction as the balance change.
+    """
+    ENTRY_TYPES = (
+        ('transfer', 'Transfer'),
+        ('top_up', 'Top-Up'),
+        ('withdraw', 'Withdraw'),
+        ('mpesa_deposit', 'M-Pesa Deposit'),
+        ('loan_disbursement', 'Loan Disbursement'),
+        ('loan_repayment', 'Loan Repayment'),
+    )
+
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImmutableQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Journal entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Journal entries are append-only.")
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} #{self.pk}"
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name_plural = "Journal entries"
+
+
+class Posting(models.Model):
+    """
+    A signed leg of a journal entry: negative amounts debit the account,
+    positive amounts credit it. Wallet legs carry the wallet; the other side
+    of a top-up, withdrawal, deposit or loan is an external account name.
+    """
+    WALLET_ACCOUNT = 'wallet'
+    ACCOUNTS = (
+        (WALLET_ACCOUNT, 'Customer Wallet'),
+        ('cash', 'Cash In/Out'),
+        ('mpesa', 'M-Pesa Clearing'),
+        ('loans', 'Loan Book'),
+    )
+
+    entry = models.ForeignKey(JournalEntry, on_delete=models.PROTECT, related_name='postings')
+    account = models.CharField(max_length=10, choices=ACCOUNTS, default=WALLET_ACCOUNT)
+    wallet = models.ForeignKey(Wallet, on_delete=models.PROTECT, null=True, blank=True, related_name='postings')
+    amount = models.BigIntegerField()  # signed cents
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImmutableQuerySet.as_manager()
+
+    @property
+    def is_debit(self):
+        return self.amount < 0
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Postings are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Postings are append-only.")
+
+    def __str__(self):
+        return f"{self.account} {format_cents(self.amount)} (entry {self.entry_id})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['wallet', 'id'], name='posting_wallet_id_idx'),
+            models.Index(fields=['wallet', 'created_at'], name='posting_wallet_created_idx'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Journal-derived balance of a wallet as of posting last_posting_id.
+    A point-in-time balance is the latest snapshot at or before that time
+    plus the (bounded) sum of postings after it.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='snapshots')
+    last_posting_id = models.BigIntegerField(default=0)
+    balance = models.BigIntegerField()  # cents
+    taken_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.wallet.account_number} @ {self.taken_at:%Y-%m-%d %H:%M} = {format_cents(self.balance)}"
+
+    class Meta:
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['wallet', '-last_posting_id'], name='snapshot_wallet_posting_idx'),
+            models.Index(fields=['wallet', '-taken_at'], name='snapshot_wallet_taken_idx'),
+        ]
+
+
+class BulkDisbursement(models.Model):
+    """A payroll or mass-payout batch submitted in one request."""
+    STATUS_CHOICES = (
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bulk_disbursements')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='processing')
+    total_items = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    total_amount = models.BigIntegerField(default=0)  # cents
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Bulk #{self.pk} | {self.user.username} | {self.succeeded}/{self.total_items}"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class BulkDisbursementItem(models.Model):
+    STATUS_CHOICES = (
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    batch = models.ForeignKey(BulkDisbursement, on_delete=models.CASCADE, related_name='items')
+    row_number = models.PositiveIntegerField()
+    receiver_username = models.CharField(max_length=150)
+    amount = models.BigIntegerField(null=True, blank=True)  # cents
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    detail = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"Row {self.row_number} | {self.receiver_username} | {self.status}"
+
+    class Meta:
+        ordering = ['batch', 'row_number']
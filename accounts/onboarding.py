@@ -0,0 +1,85 @@
+# accounts/onboarding.py
+
+import csv
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import account_numbers
+from .hashers import TransferPinHasher
+from .models import Profile, Wallet
+
+PROFILE_FIELDS = ('id_number', 'phone', 'date_of_birth', 'address', 'bio')
+
+
+def iter_customers(path, fmt=None):
+    """
+    Stream customer dicts from a CSV (with a header row) or NDJSON file,
+    one line at a time. The format defaults to the file extension.
+    """
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def hash_credentials(customer):
+    """Password and transfer PIN hashes for one customer. Runs in worker processes."""
+    pin = customer.get('pin')
+    return (
+        make_password(customer.get('password') or None),
+        make_password(str(pin), hasher=TransferPinHasher.algorithm) if pin else None,
+    )
+
+
+def new_customers(chunk):
+    """
+    Drop rows whose username is missing, repeated within the chunk or already
+    in the database, so a partly loaded file can simply be re-run.
+    """
+    by_username = {}
+    for customer in chunk:
+        username = str(customer.get('username') or '').strip()
+        if username and username not in by_username:
+            by_username[username] = {**customer, 'username': username}
+    existing = set(User.objects.filter(username__in=by_username).values_list('username', flat=True))
+    return [customer for username, customer in by_username.items() if username not in existing]
+
+
+def create_customers(customers, credentials):
+    """
+    Insert Users, Profiles and Wallets for one chunk with three bulk_create
+    calls in a single transaction. No per-row saves or signals run.
+    """
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                username=c['username'],
+                email=c.get('email') or '',
+                first_name=c.get('first_name') or '',
+                last_name=c.get('last_name') or '',
+                password=password,
+            )
+            for c, (password, _) in zip(customers, credentials)
+        ])
+        # Re-read the ids rather than relying on bulk_create returning them (not every backend does).
+        ids = dict(User.objects.filter(username__in=[c['username'] for c in customers]).values_list('username', 'id'))
+        Profile.objects.bulk_create([
+            Profile(
+                user_id=ids[c['username']],
+                transfer_pin=pin,
+                **{field: c.get(field) or None for field in PROFILE_FIELDS},
+            )
+            for c, (_, pin) in zip(customers, credentials)
+        ])
+        Wallet.objects.bulk_create([
+            Wallet(user_id=ids[c['username']], account_number=number)
+            for c, number in zip(customers, account_numbers.allocate(len(customers)))
+        ])
+    return len(customers)
@@ -0,0 +1,102 @@
+# accounts/rollups.py
+"""
+Daily per-customer activity rollups (DailyWalletRollup), updated in the
+transaction that inserts the history rows.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyWalletRollup, HistoryArchive, TransactionHistory
+
+
+def _is_outflow(row):
+    return row.transaction_type == 'withdraw' or (row.transaction_type == 'transfer' and row.sender_id == row.user_id)
+
+
+def _upsert_sql():
+    qn = connection.ops.quote_name
+    table = qn(DailyWalletRollup._meta.db_table)
+    key = ", ".join(qn(c) for c in ('user_id', 'date', 'transaction_type', 'direction', 'slot'))
+    least, greatest = ('LEAST', 'GREATEST') if connection.vendor == 'postgresql' else ('MIN', 'MAX')
+    count, total, low, high = (qn(c) for c in ('count', 'total', 'min_amount', 'max_amount'))
+    return (
+        f"INSERT INTO {table} ({key}, {count}, {total}, {low}, {high}) "
+        f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({key}) DO UPDATE SET "
+        f"{count} = {table}.{count} + EXCLUDED.{count}, "
+        f"{total} = {table}.{total} + EXCLUDED.{total}, "
+        f"{low} = {least}({table}.{low}, EXCLUDED.{low}), "
+        f"{high} = {greatest}({table}.{high}, EXCLUDED.{high})"
+    )
+
+
+def record(rows):
+    """Add just-inserted TransactionHistory rows (with pks) to the rollup; incomplete rows are skipped."""
+    groups = defaultdict(lambda: [0, 0, None, None])
+    for row in rows:
+        if row.status != 'completed':
+            continue
+        key = (
+            row.user_id,
+            timezone.localdate(row.timestamp),
+            row.transaction_type,
+            'out' if _is_outflow(row) else 'in',
+            row.pk % settings.DAILY_ROLLUP_SLOTS,
+        )
+        group = groups[key]
+        group[0] += 1
+        group[1] += row.amount
+        group[2] = row.amount if group[2] is None else min(group[2], row.amount)
+        group[3] = row.amount if group[3] is None else max(group[3], row.amount)
+    if not groups:
+        return
+
+    adapt = connection.ops.adapt_datefield_value
+    # Keys are upserted in sorted order so two transactions touching the same rows can't deadlock.
+    params = [(user_id, adapt(day), *rest, *values) for (user_id, day, *rest), values in sorted(groups.items())]
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+
+
+def _archived_months(field):
+    """Q matching dates in months moved to the history archive, whose rollups can't be recomputed."""
+    archived = Q()
+    for month in HistoryArchive.objects.dates('month', 'month'):
+        following = (month + timedelta(days=31)).replace(day=1)
+        archived |= Q(**{f'{field}__gte': month, f'{field}__lt': following})
+    return archived
+
+
+def rebuild(batch_size=1000):
+    """Recompute every rollup row from hot history, keeping archived months'. Returns the number written."""
+    outflow = Q(transaction_type='withdraw') | Q(transaction_type='transfer', sender_id=F('user_id'))
+    groups = (
+        TransactionHistory.objects.filter(status='completed')
+        .annotate(day=TruncDate('timestamp'), flow=Case(When(outflow, then=Value('out')), default=Value('in')))
+        .exclude(_archived_months('day'))
+        .order_by()
+        .values('user_id', 'day', 'transaction_type', 'flow')
+        .annotate(rows=Count('id'), volume=Sum('amount'), smallest=Min('amount'), largest=Max('amount'))
+    )
+    written = 0
+    with transaction.atomic():
+        DailyWalletRollup.objects.exclude(_archived_months('date')).delete()
+        batch = []
+        for group in groups.iterator(chunk_size=batch_size):
+            batch.append(DailyWalletRollup(
+                user_id=group['user_id'], date=group['day'], transaction_type=group['transaction_type'],
+                direction=group['flow'], count=group['rows'], total=group['volume'],
+                min_amount=group['smallest'], max_amount=group['largest'],
+            ))
+            if len(batch) >= batch_size:
+                written += len(DailyWalletRollup.objects.bulk_create(batch))
+                batch = []
+        written += len(DailyWalletRollup.objects.bulk_create(batch))
+    return written
@@ -0,0 +1,77 @@
+# accounts/search.py
+"""
+Full-text search over transaction history descriptions and counterparties.
+
+The index is kept by database triggers created in migrations
+0017_history_search and 0020_history_search_update_trigger, so every
+insert or edit path (services, bulk disbursements, admin, raw SQL) is
+covered:
+
+- SQLite: an FTS5 table accounts_history_fts keyed by history id, with the
+  owner ("u<user id>") as a column so a customer's search never looks at
+  other customers' postings lists. Ranked with bm25.
+- PostgreSQL: a trigger-maintained tsvector column search_document with a
+  GIN index, counterparties weighted above descriptions. Ranked with
+  ts_rank_cd.
+
+Counterparty usernames are captured when the row is inserted or edited.
+
+Note: Django rebuilds SQLite tables on some schema changes, which drops
+their triggers; a migration altering TransactionHistory must recreate them.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import TransactionHistory
+
+FTS_TABLE = 'accounts_history_fts'
+MAX_TERMS = 8
+
+
+def terms(text):
+    """Alphanumeric words of a query, lowercased; at most MAX_TERMS of them."""
+    return re.findall(r'[^\W_]+', (text or '').lower())[:MAX_TERMS]
+
+
+def expressions(text, user_id=None):
+    """
+    (condition, rank) expressions for rows matching every word of text as a
+    prefix; rank is higher for more relevant rows. Pass user_id when only
+    one customer's rows are wanted. Returns None if text has no words.
+    """
+    words = terms(text)
+    if not words:
+        return None
+    table = TransactionHistory._meta.db_table
+
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(f"{word}:*" for word in words)
+        return (
+            RawSQL(f"{table}.search_document @@ to_tsquery('simple', %s)", [query], output_field=BooleanField()),
+            RawSQL(f"ts_rank_cd({table}.search_document, to_tsquery('simple', %s))", [query], output_field=FloatField()),
+        )
+
+    match = ' AND '.join(f'"{word}"*' for word in words)
+    if user_id is not None:
+        match = f'owner : "u{user_id}" AND {match}'
+    return (
+        RawSQL(f"{table}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)", [match],
+               output_field=BooleanField()),
+        RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, 0.0, 2.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)", [match], output_field=FloatField()
+        ),
+    )
+
+
+def search(queryset, text, user_id=None):
+    """Narrow a TransactionHistory queryset to rows matching text, annotated with their `rank`."""
+    found = expressions(text, user_id)
+    if found is None:
+        return queryset.none()
+    condition, rank = found
+    return queryset.filter(condition).annotate(rank=rank)
@@ -3,7 +3,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.db import transaction
-from .models import Profile, Wallet, TransactionHistory
+from django.db.models import F
+
+from core.money import MoneyField
+from .models import Profile, Wallet, TransactionHistory, BulkDisbursement, BulkDisbursementItem
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -68,15 +71,19 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class WalletSerializer(serializers.ModelSerializer):
+    balance = MoneyField(source='total_balance', read_only=True)
+
     class Meta:
         model = Wallet
         fields = ['id', 'balance', 'created_at']
 
 
 class TransactionHistorySerializer(serializers.ModelSerializer):
-    user = serializers.StringRelatedField()
-    sender = serializers.StringRelatedField()
-    receiver = serializers.StringRelatedField()
+    # Querysets should select_related('user', 'sender', 'receiver').
+    user = serializers.CharField(source='user.username', read_only=True)
+    sender = serializers.CharField(source='sender.username', read_only=True, allow_null=True)
+    receiver = serializers.CharField(source='receiver.username', read_only=True, allow_null=True)
+    amount = MoneyField(read_only=True)
 
     class Meta:
         model = TransactionHistory
@@ -84,3 +91,87 @@ class TransactionHistorySerializer(serializers.ModelSerializer):
             'id', 'user', 'sender', 'receiver', 'amount',
             'transaction_type', 'status', 'description', 'timestamp'
         ]
+
+
+class TransactionHistoryRowSerializer(serializers.Serializer):
+    """
+    Read-only rendering of TransactionHistory values() rows, for list
+    endpoints: related usernames arrive as annotated columns, so there are
+    no model instances and no per-row queries.
+    """
+    id = serializers.IntegerField()
+    user = serializers.CharField(source='user_username')
+    sender = serializers.CharField(source='sender_username', allow_null=True)
+    receiver = serializers.CharField(source='receiver_username', allow_null=True)
+    amount = MoneyField()
+    transaction_type = serializers.CharField()
+    status = serializers.CharField()
+    description = serializers.CharField(allow_null=True)
+    timestamp = serializers.DateTimeField()
+
+    @staticmethod
+    def values(queryset, *extra):
+        """The row dicts this serializer reads, plus any extra (e.g. annotated) fields."""
+        return queryset.values(
+            'id', 'amount', 'transaction_type', 'status', 'description', 'timestamp', *extra,
+            user_username=F('user__username'),
+            sender_username=F('sender__username'),
+            receiver_username=F('receiver__username'),
+        )
+
+
+class StatementSummarySerializer(serializers.Serializer):
+    year = serializers.IntegerField()
+    month = serializers.IntegerField()
+    opening_balance = MoneyField()
+    closing_balance = MoneyField()
+    totals = serializers.DictField(child=MoneyField())
+    statuses = serializers.DictField(child=serializers.IntegerField())
+
+
+class WalletActivitySerializer(serializers.Serializer):
+    """One bucket of DailyWalletRollup rows, as aggregated by WalletActivityView."""
+    period = serializers.DateField()
+    transaction_type = serializers.CharField()
+    direction = serializers.CharField()
+    count = serializers.IntegerField(source='rows')
+    total = MoneyField(source='amount')
+    min_amount = MoneyField(source='smallest')
+    max_amount = MoneyField(source='largest')
+
+
+class CounterpartySerializer(serializers.Serializer):
+    username = serializers.CharField()
+    total = MoneyField()
+    count = serializers.IntegerField()
+
+
+class SpendingSpikeSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    amount = MoneyField()
+
+
+class SpendingInsightsSerializer(serializers.Serializer):
+    transactions = serializers.IntegerField()
+    total_spent = MoneyField()
+    average_daily_spend = MoneyField()
+    burn_rate_30d = MoneyField()
+    spent_last_30d = MoneyField()
+    top_counterparties = CounterpartySerializer(many=True)
+    spikes = SpendingSpikeSerializer(many=True)
+
+
+class BulkDisbursementSerializer(serializers.ModelSerializer):
+    total_amount = MoneyField(read_only=True)
+
+    class Meta:
+        model = BulkDisbursement
+        fields = ['id', 'status', 'total_items', 'succeeded', 'failed', 'total_amount', 'created_at']
+
+
+class BulkDisbursementItemSerializer(serializers.ModelSerializer):
+    amount = MoneyField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = BulkDisbursementItem
+        fields = ['row_number', 'receiver_username', 'amount', 'status', 'detail']
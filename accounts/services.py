@@ -0,0 +1,242 @@
+# accounts/services.py
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction, connection, OperationalError
+from django.db.models import F, Value
+from django.db.models.functions import NullIf
+
+from . import ledger, rollups, wallet_cache
+from .models import Wallet, WalletShard, TransactionHistory, Posting
+
+
+# Postgres SQLSTATEs for serialization failure and deadlock.
+RETRYABLE_PGCODES = {'40001', '40P01'}
+
+
+class WalletError(Exception):
+    """Base class for wallet mutation failures."""
+
+
+class InsufficientFunds(WalletError):
+    """The debit guard rejected the update (low balance, frozen or inactive wallet)."""
+
+
+def _is_retryable(exc):
+    cause = exc.__cause__
+    if getattr(cause, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    # SQLite reports writer contention as "database is locked" / "table is locked".
+    return 'locked' in str(exc)
+
+
+# Retryable failures of run_atomic() calls nested in an outer run_atomic(), which retries them.
+_nested_failures = ContextVar('nested_failures', default=None)
+
+
+def run_atomic(func, *args, **kwargs):
+    """
+    Run func inside transaction.atomic(), retrying on serialization failures,
+    deadlocks and lock timeouts with jittered exponential backoff.
+
+    When called inside an outer atomic block the failure is re-raised instead,
+    since only the outermost transaction can be safely retried. If that block
+    is itself a run_atomic(), it retries even when func caught the error.
+    """
+    if connection.in_atomic_block:
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            failures = _nested_failures.get()
+            if failures is not None and _is_retryable(exc):
+                failures.append(exc)
+            raise
+
+    max_retries = getattr(settings, 'WALLET_MUTATION_MAX_RETRIES', 5)
+    attempt = 0
+    while True:
+        failures = []
+        token = _nested_failures.set(failures)
+        try:
+            with transaction.atomic():
+                result = func(*args, **kwargs)
+                if failures:
+                    raise failures[0]
+                return result
+        except OperationalError as exc:
+            if attempt >= max_retries or not _is_retryable(exc):
+                raise
+            attempt += 1
+            time.sleep(random.uniform(0, 0.005 * 2 ** attempt))
+        finally:
+            _nested_failures.reset(token)
+
+
+def debit(user_id, amount):
+    """
+    Single guarded UPDATE:
+    SET balance = balance - amount WHERE balance >= amount AND is_active AND NOT is_frozen.
+
+    Hot wallets whose folded balance is short get their shards folded in
+    before the guard is tried a second time.
+    """
+    guarded = Wallet.objects.filter(user_id=user_id, balance__gte=amount, is_active=True, is_frozen=False)
+    changes = {'balance': F('balance') - amount, 'version': F('version') + 1}
+    if guarded.update(**changes):
+        wallet_cache.publish_current(user_id)
+        return
+
+    wallet = Wallet.objects.filter(user_id=user_id).values('pk', 'shard_count').first()
+    if wallet is None:
+        raise Wallet.DoesNotExist
+    if wallet['shard_count'] and fold_shards(wallet['pk']) and guarded.update(**changes):
+        wallet_cache.publish_current(user_id)
+        return
+    raise InsufficientFunds("Insufficient funds or wallet is frozen.")
+
+
+def credit(user_id, amount):
+    """
+    Credit the wallet row directly, or for a hot wallet, one shard picked at
+    random so concurrent payers don't queue on a single row lock.
+    """
+    while True:
+        if Wallet.objects.filter(user_id=user_id, shard_count=0).update(balance=F('balance') + amount, version=F('version') + 1):
+            wallet_cache.publish_current(user_id)
+            return
+
+        # A wallet switched back to plain mode meanwhile matches no shard rather than dividing by zero.
+        shard = WalletShard.objects.filter(
+            wallet__user_id=user_id,
+            index=Value(random.randrange(2 ** 15)) % NullIf(F('wallet__shard_count'), Value(0)),
+        )
+        if shard.update(balance=F('balance') + amount):
+            return
+        if not Wallet.objects.filter(user_id=user_id).exists():
+            raise Wallet.DoesNotExist
+
+
+def fold_shards(wallet_id):
+    """
+    Move every shard balance of a hot wallet into Wallet.balance.
+    Returns the amount folded.
+    """
+    with transaction.atomic():
+        # Shards are locked in index order, matching every other folder.
+        balances = list(
+            WalletShard.objects.select_for_update()
+            .filter(wallet_id=wallet_id, balance__gt=0)
+            .order_by('index')
+            .values_list('pk', 'balance')
+        )
+        total = sum(balance for _, balance in balances)
+        if total:
+            WalletShard.objects.filter(pk__in=[pk for pk, _ in balances]).update(balance=0)
+            Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + total)
+        return total
+
+
+def enable_sharding(wallet, shard_count=None):
+    """Switch a wallet to hot-wallet mode backed by shard_count balance shards."""
+    shard_count = shard_count or settings.HOT_WALLET_DEFAULT_SHARDS
+    with transaction.atomic():
+        fold_shards(wallet.pk)
+        WalletShard.objects.filter(wallet=wallet).delete()
+        WalletShard.objects.bulk_create([WalletShard(wallet=wallet, index=i) for i in range(shard_count)])
+        Wallet.objects.filter(pk=wallet.pk).update(shard_count=shard_count, version=F('version') + 1)
+        wallet_cache.publish_current(wallet.user_id)
+    wallet.shard_count = shard_count
+
+
+def disable_sharding(wallet):
+    with transaction.atomic():
+        Wallet.objects.filter(pk=wallet.pk).update(shard_count=0, version=F('version') + 1)
+        fold_shards(wallet.pk)
+        WalletShard.objects.filter(wallet=wallet).delete()
+        wallet_cache.publish_current(wallet.user_id)
+    wallet.shard_count = 0
+
+
+def _apply_legs(legs):
+    # Row locks are taken by the UPDATEs themselves; applying them in user id
+    # order means two opposite transfers can never wait on each other.
+    for user_id, delta in sorted(legs):
+        if delta < 0:
+            debit(user_id, -delta)
+        else:
+            credit(user_id, delta)
+
+
+def credit_from(account, user_id, amount, entry_type, description=""):
+    """Credit a wallet from an external journal account (M-Pesa, loan book, ...)."""
+    def apply():
+        credit(user_id, amount)
+        ledger.post_entry(entry_type, description, [
+            (account, None, -amount),
+            (Posting.WALLET_ACCOUNT, user_id, amount),
+        ])
+
+    run_atomic(apply)
+
+
+def debit_to(account, user_id, amount, entry_type, description=""):
+    """Debit a wallet into an external journal account."""
+    def apply():
+        debit(user_id, amount)
+        ledger.post_entry(entry_type, description, [
+            (Posting.WALLET_ACCOUNT, user_id, -amount),
+            (account, None, amount),
+        ])
+
+    run_atomic(apply)
+
+
+def transfer(sender, receiver, amount):
+    def apply():
+        _apply_legs([(sender.pk, -amount), (receiver.pk, amount)])
+        ledger.post_entry("transfer", f"{sender.username} to {receiver.username}", [
+            (Posting.WALLET_ACCOUNT, sender.pk, -amount),
+            (Posting.WALLET_ACCOUNT, receiver.pk, amount),
+        ])
+        rollups.record(TransactionHistory.objects.bulk_create([
+            TransactionHistory(
+                user=sender, sender=sender, receiver=receiver,
+                amount=amount, transaction_type="transfer", status="completed",
+                description=f"Transfer to {receiver.username}"
+            ),
+            TransactionHistory(
+                user=receiver, sender=sender, receiver=receiver,
+                amount=amount, transaction_type="transfer", status="completed",
+                description=f"Received from {sender.username}"
+            )
+        ]))
+
+    run_atomic(apply)
+
+
+def top_up(user, amount, description="Wallet top-up"):
+    def apply():
+        credit_from("cash", user.pk, amount, "top_up", description)
+        rollups.record([TransactionHistory.objects.create(
+            user=user, sender=user, receiver=user,
+            amount=amount, transaction_type="top_up", status="completed",
+            description=description
+        )])
+
+    run_atomic(apply)
+
+
+def withdraw(user, amount, description="Wallet withdrawal"):
+    def apply():
+        debit_to("cash", user.pk, amount, "withdraw", description)
+        rollups.record([TransactionHistory.objects.create(
+            user=user, sender=user, receiver=user,
+            amount=amount, transaction_type="withdraw", status="completed",
+            description=description
+        )])
+
+    run_atomic(apply)
@@ -3,7 +3,6 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
 from .models import Profile, Wallet
 import logging
 
@@ -27,24 +26,23 @@ def create_profile_and_wallet(sender, instance, created, **kwargs):
             logger.error(f"Error creating profile or wallet for user {instance.username}: {e}")
 
 @receiver(post_save, sender=User)
-def save_profile_and_wallet(sender, instance, **kwargs):
+def save_profile_and_wallet(sender, instance, created, **kwargs):
     """
-    Save associated Profile and Wallet whenever the User instance is updated.
+    Write back changes made to a User's already-loaded Profile or Wallet.
+    Relations that were never loaded are left alone (no query), and only
+    fields that actually changed are written, so a stale in-memory wallet
+    balance can't overwrite a concurrent balance update.
     """
-    try:
-        if hasattr(instance, 'profile') and instance.profile:
-            instance.profile.save()
-            logger.info(f"Profile saved for user {instance.username}.")
-    except ObjectDoesNotExist:
-        logger.warning(f"Profile does not exist for user {instance.username}.")
-    except Exception as e:
-        logger.error(f"Error saving profile for user {instance.username}: {e}")
-
-    try:
-        if hasattr(instance, 'wallet') and instance.wallet:
-            instance.wallet.save()
-            logger.info(f"Wallet saved for user {instance.username}.")
-    except ObjectDoesNotExist:
-        logger.warning(f"Wallet does not exist for user {instance.username}.")
-    except Exception as e:
-        logger.error(f"Error saving wallet for user {instance.username}: {e}")
+    if created:
+        return
+    for descriptor in (User.profile, User.wallet):
+        if not descriptor.is_cached(instance):
+            continue
+        related = descriptor.related.get_cached_value(instance)
+        if related is None:
+            continue
+        try:
+            if written := related.save_dirty():
+                logger.info(f"{type(related).__name__} fields {', '.join(written)} saved for user {instance.username}.")
+        except Exception as e:
+            logger.error(f"Error saving {type(related).__name__.lower()} for user {instance.username}: {e}")
@@ -0,0 +1,137 @@
+# accounts/statements.py
+"""
+Monthly PDF statements, cached in the private storage under a name derived
+from the month's version(), which doubles as the ETag.
+"""
+
+import hashlib
+import itertools
+from datetime import timedelta
+
+from django.core.files.base import File
+from django.core.files.storage import storages
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from core import filters
+from core.pdf_utils import CHUNK_SIZE, generate_statement_pdf
+
+from . import archive, ledger
+from .models import Posting, TransactionHistory, Wallet
+
+DIRECTORY = 'statements'
+
+
+def month_rows(user_id, year, month):
+    bounds = filters.month_bounds(year, month)
+    return filters.filter_range(TransactionHistory.objects.filter(user_id=user_id), 'timestamp', bounds)
+
+
+def archived_parts(user_id, year, month):
+    return archive.parts(user_id, filters.month_bounds(year, month), newest_first=False)
+
+
+def version(user_id, year, month):
+    """
+    (last history id, row count, last posting id, last archive part id)
+    for the month, or None when it has no history rows, postings or
+    archived rows.
+    """
+    history = month_rows(user_id, year, month).aggregate(last_id=Max('id'), rows=Count('id'))
+    postings = filters.filter_range(
+        Posting.objects.filter(wallet__user_id=user_id), 'created_at', filters.month_bounds(year, month)
+    ).aggregate(last_id=Max('id'))
+    archived = max((part.pk for part, _ in archived_parts(user_id, year, month)), default=0)
+    if not history['rows'] and postings['last_id'] is None and not archived:
+        return None
+    return history['last_id'] or 0, history['rows'], postings['last_id'] or 0, archived
+
+
+def etag(user_id, year, month, ver):
+    key = ":".join(str(part) for part in (user_id, year, month, *ver))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def summary(user_id, year, month):
+    start, end = filters.month_bounds(year, month)
+    wallet_id = Wallet.objects.values_list('pk', flat=True).get(user_id=user_id)
+    statuses = [status for status, _ in TransactionHistory.STATUS_CHOICES]
+    groups = month_rows(user_id, year, month).order_by().values('transaction_type').annotate(
+        total=Sum('amount', filter=Q(status='completed')),
+        **{status: Count('id', filter=Q(status=status)) for status in statuses},
+    )
+
+    totals = {tx_type: 0 for tx_type, _ in TransactionHistory.TRANSACTION_TYPES}
+    counts = dict.fromkeys(statuses, 0)
+    for group in groups:
+        totals[group['transaction_type']] = group['total'] or 0
+        for status in statuses:
+            counts[status] += group[status]
+    for row in archive.user_rows(user_id, (start, end)):
+        if row['status'] == 'completed':
+            totals[row['transaction_type']] += row['amount']
+        counts[row['status']] += 1
+
+    instant = timedelta(microseconds=1)
+    return {
+        'year': year,
+        'month': month,
+        'opening_balance': ledger.balance_at(wallet_id, start - instant),
+        'closing_balance': ledger.balance_at(wallet_id, min(end - instant, timezone.now())),
+        'totals': totals,
+        'statuses': counts,
+    }
+
+
+def _prefix(user_id, year, month):
+    return f"{DIRECTORY}/{user_id}/{year}-{month:02d}-"
+
+
+def path(user_id, year, month, ver):
+    return f"{_prefix(user_id, year, month)}{etag(user_id, year, month, ver)}.pdf"
+
+
+def render(user, year, month, ver=None):
+    """
+    Store the statement for ver (looked up if omitted) unless already
+    stored, drop renders of the same month stored before it, and return its path,
+    or None when the month has no rows.
+    """
+    ver = ver or version(user.pk, year, month)
+    if ver is None:
+        return None
+    name = path(user.pk, year, month, ver)
+    storage = storages['private']
+    if storage.exists(name):
+        return name
+
+    archived = archive.user_rows(user.pk, filters.month_bounds(year, month), newest_first=False)
+    hot = (
+        month_rows(user.pk, year, month).filter(id__lte=ver[0]).order_by('timestamp', 'id')
+        .values_list('timestamp', 'transaction_type', 'amount', 'status').iterator(chunk_size=CHUNK_SIZE)
+    )
+    rows = itertools.chain(
+        ((row['timestamp'], row['transaction_type'], row['amount'], row['status']) for row in archived), hot
+    )
+    type_labels = dict(TransactionHistory.TRANSACTION_TYPES)
+    with generate_statement_pdf(user, rows, month, year, summary=summary(user.pk, year, month),
+                                type_labels=type_labels) as pdf:
+        saved = storage.save(name, File(pdf))
+    if saved != name:
+        # Another worker stored the same version first; keep theirs.
+        storage.delete(saved)
+        return name
+
+    # Only renders stored before this one: a concurrent render of a newer version keeps its file.
+    directory, prefix = f"{DIRECTORY}/{user.pk}", _prefix(user.pk, year, month).rsplit('/', 1)[1]
+    written = storage.get_modified_time(name)
+    for stale in storage.listdir(directory)[1]:
+        stale = f"{directory}/{stale}"
+        if not stale.startswith(f"{directory}/{prefix}") or stale == name:
+            continue
+        try:
+            if storage.get_modified_time(stale) < written:
+                storage.delete(stale)
+        except FileNotFoundError:
+            pass
+    return name
@@ -1,3 +1,794 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, IntegrityError, transaction
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Max, Min, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import money
+
+from . import account_numbers, analytics, bulk, exports, ledger, rollups, services, statements, wallet_cache
+from .models import Profile, Wallet, TransactionHistory, DailyWalletRollup, HistoryArchive, JournalEntry, Posting, BalanceSnapshot, BulkDisbursementItem
+
+
+def private_storage(location):
+    """Point the private storage at location."""
+    private = {**settings.STORAGES['private'], 'OPTIONS': {'location': location}}
+    return override_settings(STORAGES={**settings.STORAGES, 'private': private})
+
+
+class WalletServiceTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        Wallet.objects.filter(user=self.alice).update(balance=100_00)
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_transfer_moves_funds_and_logs_both_sides(self):
+        services.transfer(self.alice, self.bob, 40_00)
+        self.assertEqual(self.balance(self.alice), 60_00)
+        self.assertEqual(self.balance(self.bob), 40_00)
+        self.assertEqual(TransactionHistory.objects.filter(transaction_type='transfer').count(), 2)
+
+    def test_overdraft_is_rejected_without_side_effects(self):
+        with self.assertRaises(services.InsufficientFunds):
+            services.transfer(self.alice, self.bob, 100_01)
+        self.assertEqual(self.balance(self.alice), 100_00)
+        self.assertEqual(self.balance(self.bob), 0)
+        self.assertFalse(TransactionHistory.objects.exists())
+
+    def test_frozen_wallet_cannot_be_debited(self):
+        Wallet.objects.filter(user=self.alice).update(is_frozen=True)
+        with self.assertRaises(services.InsufficientFunds):
+            services.withdraw(self.alice, 1_00)
+
+    def test_negative_balance_is_rejected_by_the_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Wallet.objects.filter(user=self.bob).update(balance=-1_00)
+
+    def test_hot_wallet_credits_land_on_shards_and_debits_fold_them(self):
+        services.enable_sharding(self.bob.wallet, 4)
+        for _ in range(10):
+            services.credit(self.bob.pk, 3_00)
+        wallet = Wallet.objects.get(user=self.bob)
+        self.assertEqual(wallet.balance, 0)
+        self.assertEqual(wallet.total_balance, 30_00)
+
+        services.transfer(self.bob, self.alice, 25_00)
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, 5_00)
+        self.assertEqual(wallet.total_balance, 5_00)
+        with self.assertRaises(services.InsufficientFunds):
+            services.withdraw(self.bob, 5_01)
+
+    def test_credit_racing_disable_sharding_lands_on_the_wallet(self):
+        services.enable_sharding(self.bob.wallet, 4)
+
+        def disabled_meanwhile(stop):
+            services.disable_sharding(self.bob.wallet)
+            return 0
+
+        with patch('accounts.services.random.randrange', side_effect=disabled_meanwhile):
+            services.credit(self.bob.pk, 3_00)
+        self.assertEqual(self.balance(self.bob), 3_00)
+
+    def test_parse_amount_is_exact_cents(self):
+        self.assertEqual(money.parse_amount("10.5"), 10_50)
+        self.assertEqual(money.parse_amount("0.29"), 29)
+        self.assertEqual(money.parse_amount("10000000000000"), money.MAX_CENTS)
+        for raw in (None, "abc", "0", "-5", "NaN", "10.005", True, "10000000000000.01", "1e30"):
+            with self.assertRaises(ValueError):
+                money.parse_amount(raw)
+        self.assertEqual(money.format_kes(123456_78), "KSh 123,456.78")
+
+
+@override_settings(LEDGER_SNAPSHOT_EVERY=3)
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        services.top_up(self.alice, 100_00)
+
+    def test_every_entry_balances_and_is_append_only(self):
+        services.transfer(self.alice, self.bob, 30_00)
+        for entry in JournalEntry.objects.all():
+            self.assertEqual(sum(p.amount for p in entry.postings.all()), 0)
+        posting = Posting.objects.first()
+        with self.assertRaises(ValidationError):
+            posting.save()
+        with self.assertRaises(ValidationError):
+            Posting.objects.all().delete()
+
+    def test_point_in_time_balance_uses_snapshots(self):
+        wallet_id = self.alice.wallet.pk
+        checkpoints = []
+        for _ in range(7):
+            services.transfer(self.alice, self.bob, 10_00)
+            checkpoints.append((timezone.now(), Wallet.objects.get(pk=wallet_id).balance))
+
+        self.assertTrue(BalanceSnapshot.objects.filter(wallet_id=wallet_id).exists())
+        for at, expected in checkpoints:
+            self.assertEqual(ledger.balance_at(wallet_id, at), expected)
+        self.assertEqual(ledger.balance_at(self.bob.wallet.pk), 70_00)
+
+
+class UserSaveSignalTests(TestCase):
+    def setUp(self):
+        User.objects.create(username='alice')
+
+    def load(self):
+        return User.objects.select_related('profile', 'wallet').get(username='alice')
+
+    def test_user_save_is_a_single_statement(self):
+        user = self.load()
+        with self.assertNumQueries(1):
+            user.save()
+        user = User.objects.get(username='alice')
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_only_changed_related_fields_are_written(self):
+        user = self.load()
+        services.top_up(user, 50_00)  # the loaded wallet is now stale
+        user.profile.bio = "Hello"
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertEqual(Profile.objects.get(user=user).bio, "Hello")
+        self.assertEqual(Wallet.objects.get(user=user).balance, 50_00)
+        self.assertEqual(user.profile.dirty_fields(), [])
+
+
+class WalletCacheTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        services.top_up(self.alice, 100_00)
+        self.client.force_authenticate(self.alice)
+
+    def balance(self):
+        return self.client.get('/api/accounts/wallet/').json()['balance']
+
+    def test_unchanged_wallet_is_served_without_queries(self):
+        self.assertEqual(self.balance(), "100.00")
+        before = wallet_cache.stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.balance(), "100.00")
+        self.assertEqual(wallet_cache.stats()['hits'], before['hits'] + 1)
+
+    def test_balance_cannot_be_edited_in_the_admin(self):
+        self.balance()
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        wallet = Wallet.objects.get(user=self.alice)
+        response = self.client.post(f'/admin/accounts/wallet/{wallet.pk}/change/', {
+            'user': self.alice.pk, 'balance': 999_00, 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 100_00)
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.balance(), "100.00")
+
+    def test_every_mutation_invalidates_the_cached_snapshot(self):
+        self.balance()
+        services.transfer(self.alice, self.bob, 30_00)
+        self.assertEqual(self.balance(), "70.00")
+        bulk.run_disbursement(self.bob, [(1, 'alice', '5.00')])
+        self.assertEqual(self.balance(), "75.00")
+        services.enable_sharding(self.alice.wallet, 2)
+        services.credit(self.alice.pk, 1_00)
+        self.assertEqual(self.balance(), "76.00")
+        services.disable_sharding(self.alice.wallet)
+        self.assertEqual(self.balance(), "76.00")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.balance(), "76.00")
+
+
+class HistoryExportTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        services.top_up(self.alice, 100_00)
+        services.transfer(self.alice, self.bob, 12_50)
+        self.client.force_authenticate(self.alice)
+
+    def export(self, fmt, **headers):
+        response = self.client.get(f'/api/accounts/wallet/history/export/{fmt}/', **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_export_streams_every_row_oldest_first(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.COLUMNS))
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['top_up', 'transfer'])
+        self.assertIn('12.50,alice,bob', lines[2])
+
+    def test_ndjson_export_applies_history_filters(self):
+        _, body = self.export('ndjson')
+        self.assertEqual(len(body.splitlines()), 2)
+        response = self.client.get('/api/accounts/wallet/history/export/ndjson/?type=transfer')
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([(r['transaction_type'], r['amount']) for r in rows], [('transfer', '12.50')])
+
+    def test_gzip_when_accepted(self):
+        _, plain = self.export('csv')
+        response, body = self.export('csv', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/accounts/wallet/history/export/xlsx/')
+        self.assertEqual(response.status_code, 400)
+
+
+class StatementCacheTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(private_storage(media.name))
+        self.root = media.name
+        self.alice = User.objects.create(username='alice')
+        services.top_up(self.alice, 100_00)
+        self.client.force_authenticate(self.alice)
+        today = timezone.localdate()
+        self.url = f'/api/accounts/wallet/statements/pdf/?month={today.month}&year={today.year}'
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_repeat_download_reads_the_stored_render(self):
+        first, pdf = self.download()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        with patch('accounts.statements.generate_statement_pdf') as render:
+            again, body = self.download()
+        render.assert_not_called()
+        self.assertEqual((again['ETag'], body), (first['ETag'], pdf))
+
+        not_modified, _ = self.download(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_new_history_row_changes_the_version(self):
+        first, _ = self.download()
+        services.withdraw(self.alice, 10_00)
+        second, _ = self.download(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(len(os.listdir(os.path.join(self.root, 'statements', str(self.alice.pk)))), 1)
+
+    def test_render_removed_by_a_concurrent_render_is_stored_again(self):
+        real_render = statements.render
+
+        def raced(*args):
+            name = real_render(*args)
+            if not raced.done:
+                raced.done = True
+                storages['private'].delete(name)
+            return name
+
+        raced.done = False
+        with patch('accounts.statements.render', side_effect=raced):
+            response, pdf = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_render_stored_by_a_concurrent_request_after_ours_is_kept(self):
+        today = timezone.localdate()
+        concurrent = f"{statements.DIRECTORY}/{self.alice.pk}/{today.year}-{today.month:02d}-concurrent.pdf"
+        storage = storages['private']
+        real_save = storage.save
+
+        def save_then_race(name, content):
+            saved = real_save(name, content)
+            time.sleep(0.01)
+            real_save(concurrent, content)
+            return saved
+
+        with patch.object(storage, 'save', side_effect=save_then_race):
+            name = statements.render(self.alice, today.year, today.month)
+        self.assertTrue(storage.exists(name))
+        self.assertTrue(storage.exists(concurrent))
+
+    def test_posting_without_history_row_changes_the_version(self):
+        first, _ = self.download()
+        services.credit_from('mpesa', self.alice.pk, 5_00, 'mpesa_deposit', "M-Pesa deposit")
+        second, _ = self.download(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+
+    def test_render_statements_command_prerenders_the_month(self):
+        today = timezone.localdate()
+        out = StringIO()
+        call_command('render_statements', year=today.year, month=today.month, stdout=out)
+        self.assertIn("Rendered 1 statement(s)", out.getvalue())
+        with patch('accounts.statements.generate_statement_pdf') as render:
+            self.assertEqual(self.download()[0].status_code, 200)
+        render.assert_not_called()
+
+
+class StatementSummaryTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        today = timezone.localdate()
+        self.url = f'/api/accounts/wallet/statements/summary/?month={today.month}&year={today.year}'
+        last_month = timezone.now() - timedelta(days=today.day + 1)
+        with patch('django.utils.timezone.now', return_value=last_month):
+            services.top_up(self.alice, 40_00)
+        services.top_up(self.alice, 100_00)
+        services.transfer(self.alice, self.bob, 30_00)
+        services.withdraw(self.alice, 10_00)
+        self.client.force_authenticate(self.alice)
+
+    def test_summary_balances_and_totals(self):
+        with self.assertNumQueries(7):  # wallet, grouped totals, archive index, two snapshot + tail balance lookups
+            response = self.client.get(self.url)
+        self.assertEqual(response.json(), {
+            'year': timezone.localdate().year,
+            'month': timezone.localdate().month,
+            'opening_balance': "40.00",
+            'closing_balance': "100.00",
+            'totals': {'top_up': "100.00", 'withdraw': "10.00", 'transfer': "30.00"},
+            'statuses': {'pending': 0, 'completed': 3, 'failed': 0},
+        })
+
+    def test_summary_requires_a_valid_period(self):
+        self.assertEqual(self.client.get('/api/accounts/wallet/statements/summary/?month=13&year=2025').status_code, 400)
+        self.assertEqual(self.client.get('/api/accounts/wallet/statements/summary/').status_code, 400)
+
+
+class DailyRollupTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        services.top_up(self.alice, 100_00)
+        services.transfer(self.alice, self.bob, 30_00)
+        services.transfer(self.alice, self.bob, 20_00)
+        services.withdraw(self.alice, 10_00)
+        bulk.run_disbursement(self.bob, [(1, 'alice', '5.00')])
+        self.client.force_authenticate(self.alice)
+
+    def totals(self):
+        return sorted(
+            DailyWalletRollup.objects.order_by()
+            .values_list('user__username', 'date', 'transaction_type', 'direction')
+            .annotate(Sum('count'), Sum('total'), Min('min_amount'), Max('max_amount'))
+        )
+
+    def test_inserts_are_rolled_up_like_a_rebuild(self):
+        today = timezone.localdate()
+        incremental = self.totals()
+        self.assertIn(('alice', today, 'transfer', 'out', 2, 50_00, 20_00, 30_00), incremental)
+        self.assertIn(('alice', today, 'transfer', 'in', 1, 5_00, 5_00, 5_00), incremental)
+        self.assertIn(('bob', today, 'transfer', 'in', 2, 50_00, 20_00, 30_00), incremental)
+
+        out = StringIO()
+        call_command('rebuild_daily_rollups', stdout=out)
+        self.assertEqual(self.totals(), incremental)
+
+    def test_activity_endpoint_buckets(self):
+        today = timezone.localdate()
+        response = self.client.get('/api/accounts/wallet/activity/?bucket=month&type=transfer')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'period': today.replace(day=1).isoformat(), 'transaction_type': 'transfer', 'direction': 'in',
+             'count': 1, 'total': "5.00", 'min_amount': "5.00", 'max_amount': "5.00"},
+            {'period': today.replace(day=1).isoformat(), 'transaction_type': 'transfer', 'direction': 'out',
+             'count': 2, 'total': "50.00", 'min_amount': "20.00", 'max_amount': "30.00"},
+        ])
+        daily = self.client.get('/api/accounts/wallet/activity/').json()['results']
+        self.assertEqual({(r['period'], r['transaction_type'], r['direction']) for r in daily}, {
+            (today.isoformat(), 'top_up', 'in'), (today.isoformat(), 'withdraw', 'out'),
+            (today.isoformat(), 'transfer', 'in'), (today.isoformat(), 'transfer', 'out'),
+        })
+        self.assertEqual(self.client.get('/api/accounts/wallet/activity/?bucket=hour').status_code, 400)
+
+
+class SpendingInsightsTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.carol = User.objects.create(username='carol')
+        now = timezone.now()
+        rows = [(now - timedelta(days=days), 'withdraw', 10_00, self.alice) for days in range(1, 40)]
+        rows += [(now - timedelta(days=5), 'withdraw', 500_00, self.alice)]
+        rows += [(now, 'transfer', 20_00, self.alice, self.bob)] * 3
+        rows += [(now, 'transfer', 70_00, self.carol, self.alice)]
+        for ts, tx_type, amount, sender, *receiver in rows:
+            row = TransactionHistory.objects.create(
+                user=self.alice, sender=sender, receiver=receiver[0] if receiver else sender,
+                transaction_type=tx_type, amount=amount,
+            )
+            TransactionHistory.objects.filter(pk=row.pk).update(timestamp=ts)
+        self.client.force_authenticate(self.alice)
+
+    def test_insights(self):
+        today = timezone.localdate()
+        self.assertEqual(self.client.get('/api/accounts/wallet/insights/').json(), {
+            'transactions': 44,
+            'total_spent': "950.00",
+            'average_daily_spend': "23.75",  # over the 40 days since the first transaction
+            'burn_rate_30d': "28.33",
+            'spent_last_30d': "850.00",
+            'top_counterparties': [
+                {'username': 'carol', 'total': "70.00", 'count': 1},
+                {'username': 'bob', 'total': "60.00", 'count': 3},
+            ],
+            'spikes': [{'date': (today - timedelta(days=5)).isoformat(), 'amount': "510.00"}],
+        })
+
+    def test_cached_until_new_activity(self):
+        first = analytics.spending_insights(self.alice.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(analytics.spending_insights(self.alice.pk), first)
+        services.top_up(self.alice, 1_00)
+        self.assertEqual(analytics.spending_insights(self.alice.pk)['transactions'], 45)
+
+
+class HistorySearchTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bobby_k')
+        services.top_up(self.alice, 500_00, description="Salary from Acme Holdings")
+        for amount in (10_00, 20_00, 30_00):
+            services.transfer(self.alice, self.bob, amount)
+        services.top_up(self.bob, 5_00, description="Acme refund")
+        self.client.force_authenticate(self.alice)
+
+    def ids(self, query):
+        url, found = f'/api/accounts/wallet/history/?page_size=1&{query}', []
+        while url:
+            page = self.client.get(url).json()
+            found += [row['id'] for row in page['results']]
+            url = page['next']
+        return found
+
+    def test_search_matches_descriptions_and_counterparties_of_own_history(self):
+        acme = self.ids('q=acm')
+        self.assertEqual(
+            list(TransactionHistory.objects.filter(pk__in=acme).values_list('user__username', 'description')),
+            [('alice', "Salary from Acme Holdings")],
+        )
+        bobby = self.ids('q=BOBBY')
+        self.assertEqual(len(bobby), 3)
+        self.assertEqual(len(set(bobby)), 3)
+        self.assertEqual(self.ids('q=bobby+salary'), [])
+        self.assertEqual(len(self.ids('q=bobby&type=transfer&min_amount=15')), 2)
+
+    def test_edited_rows_are_reindexed(self):
+        row = TransactionHistory.objects.get(description="Salary from Acme Holdings")
+        row.description = "Salary from Globex"
+        row.save()
+        self.assertEqual(self.ids('q=acme'), [])
+        self.assertEqual(self.ids('q=globex'), [row.pk])
+        TransactionHistory.objects.filter(pk=row.pk).update(sender=self.bob)
+        self.assertEqual(self.ids('q=globex+bobby'), [row.pk])
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create(username='root', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.get('/admin/accounts/transactionhistory/?q=acme')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertNotIn('LIKE', str(response.context['cl'].queryset.query))
+
+
+class HistoryArchiveTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(private_storage(media.name))
+        self.enterContext(override_settings(HISTORY_ARCHIVE_BLOCK_ROWS=2))
+        self.root = media.name
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        now = timezone.now()
+        self.old = now - timedelta(days=400)
+        with patch('django.utils.timezone.now', return_value=now - timedelta(days=430)):
+            services.top_up(self.alice, 100_00)
+            services.top_up(self.bob, 5_00)
+        with patch('django.utils.timezone.now', return_value=self.old):
+            services.transfer(self.alice, self.bob, 10_00)
+            services.withdraw(self.alice, 5_00)
+        services.top_up(self.alice, 1_00)
+        self.history = list(
+            TransactionHistory.objects.filter(user=self.alice).order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+        self.client.force_authenticate(self.alice)
+
+    def archive(self):
+        out = StringIO()
+        call_command('archive_history', horizon_days=365, stdout=out)
+        return out.getvalue()
+
+    def test_old_months_move_to_block_compressed_files(self):
+        self.assertIn("Archived 5 row(s).", self.archive())
+        self.assertEqual(TransactionHistory.objects.filter(timestamp__lt=self.old + timedelta(days=1)).count(), 0)
+        self.assertEqual(TransactionHistory.objects.count(), 1)
+
+        parts = list(HistoryArchive.objects.order_by('month'))
+        self.assertEqual([part.rows for part in parts], [2, 3])
+        self.assertEqual(len(parts[1].blocks), 2)
+        with open(os.path.join(self.root, parts[1].name), 'rb') as data:
+            rows = [json.loads(line) for line in gzip.decompress(data.read()).splitlines()]
+        self.assertEqual([row['user_id'] for row in rows], sorted(row['user_id'] for row in rows))
+        self.assertIn({'sender': 'alice', 'receiver': 'bob', 'amount': 10_00},
+                      [{key: row[key] for key in ('sender', 'receiver', 'amount')} for row in rows])
+
+        self.assertIn("Archived 0 row(s).", self.archive())
+        self.assertEqual(HistoryArchive.objects.count(), 2)
+
+    def test_interrupted_run_finishes_its_deletes(self):
+        with patch('accounts.archive._delete'):
+            self.archive()
+        self.assertEqual(TransactionHistory.objects.count(), 6)
+        self.archive()
+        self.assertEqual(TransactionHistory.objects.count(), 1)
+        self.assertEqual(sum(HistoryArchive.objects.values_list('rows', flat=True)), 5)
+
+    def test_history_pages_continue_into_the_archive(self):
+        self.archive()
+        seen, url = [], '/api/accounts/wallet/history/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, self.history)
+        rows = self.client.get('/api/accounts/wallet/history/?type=transfer').json()['results']
+        self.assertEqual([(row['sender'], row['user']) for row in rows], [('alice', 'alice')])
+
+    def test_export_and_statements_read_archived_months(self):
+        self.archive()
+        response = self.client.get('/api/accounts/wallet/history/export/csv/')
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], self.history[::-1])
+
+        month = timezone.localdate(self.old)
+        query = f'?month={month.month}&year={month.year}'
+        summary = self.client.get(f'/api/accounts/wallet/statements/summary/{query}').json()
+        self.assertEqual(summary['totals'], {'top_up': "0.00", 'withdraw': "5.00", 'transfer': "10.00"})
+        self.assertEqual(summary['statuses']['completed'], 2)
+        pdf = self.client.get(f'/api/accounts/wallet/statements/pdf/{query}')
+        self.assertEqual(pdf.status_code, 200)
+
+    def test_rollup_rebuild_keeps_archived_months(self):
+        before = DailyWalletRollup.objects.aggregate(total=Sum('total'))['total']
+        self.archive()
+        rollups.rebuild()
+        self.assertEqual(DailyWalletRollup.objects.aggregate(total=Sum('total'))['total'], before)
+
+
+class TransferAuthorizationTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.alice.profile.set_transfer_pin('1234')
+        Wallet.objects.filter(user=self.alice).update(balance=100_00)
+        self.client.force_authenticate(self.alice)
+
+    def authorize(self, **data):
+        return self.client.post('/api/accounts/wallet/authorize/', {'pin': '1234', **data}, format='json')
+
+    def transfer(self, **credentials):
+        payload = {'receiver_username': 'bob', 'amount': '5.00', **credentials}
+        return self.client.post('/api/accounts/wallet/transfer/', payload, format='json')
+
+    def test_token_replaces_pin_for_follow_up_transfers(self):
+        token = self.authorize().json()['transfer_token']
+        for _ in range(3):
+            self.assertEqual(self.transfer(transfer_token=token).status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.bob).balance, 15_00)
+
+    def test_token_is_scoped_and_revoked_by_pin_change(self):
+        bulk_token = self.authorize(scope='bulk_transfer').json()['transfer_token']
+        self.assertEqual(self.transfer(transfer_token=bulk_token).status_code, 403)
+
+        token = self.authorize().json()['transfer_token']
+        self.alice.profile.set_transfer_pin('9999')
+        self.assertEqual(self.transfer(transfer_token=token).status_code, 403)
+        self.assertEqual(self.authorize().status_code, 403)
+
+    def test_token_expires(self):
+        token = self.authorize().json()['transfer_token']
+        with override_settings(TRANSFER_AUTH_TOKEN_LIFETIME=-1):
+            self.assertEqual(self.transfer(transfer_token=token).status_code, 403)
+
+    def test_legacy_pin_hash_is_upgraded_on_verification(self):
+        Profile.objects.filter(user=self.alice).update(transfer_pin=make_password('1234'))
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.authorize().status_code, 200)
+        self.assertTrue(Profile.objects.get(user=self.alice).transfer_pin.startswith('pbkdf2_pin$'))
+
+
+class BulkTransferTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.payer = User.objects.create(username='payer')
+        self.payer.profile.set_transfer_pin('1234')
+        Wallet.objects.filter(user=self.payer).update(balance=100_00)
+        self.staff = [User.objects.create(username=f'staff{i}') for i in range(5)]
+        self.client.force_authenticate(self.payer)
+
+    def test_csv_upload_pays_each_row_and_records_results(self):
+        rows = ["receiver_username,amount", "staff0,10", "staff1,20.50", "ghost,5", "staff2,abc",
+                "payer,1", "staff3,70", "staff4,9.50"]
+        upload = SimpleUploadedFile("payroll.csv", "\n".join(rows).encode(), content_type="text/csv")
+        with override_settings(BULK_TRANSFER_CHUNK_SIZE=3):
+            response = self.client.post('/api/accounts/wallet/bulk-transfer/', {'pin': '1234', 'file': upload})
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['succeeded'], 3)
+        self.assertEqual(response.json()['failed'], 4)
+        balances = dict(Wallet.objects.values_list('user__username', 'balance'))
+        self.assertEqual(balances['payer'], 60_00)
+        self.assertEqual(balances['staff1'], 20_50)
+        self.assertEqual(balances['staff3'], 0)
+        statuses = dict(BulkDisbursementItem.objects.values_list('row_number', 'status'))
+        self.assertEqual(statuses, {2: 'completed', 3: 'completed', 4: 'failed', 5: 'failed',
+                                    6: 'failed', 7: 'failed', 8: 'completed'})
+        self.assertEqual(TransactionHistory.objects.count(), 6)
+        self.assertEqual(Posting.objects.filter(amount__lt=0).count(), 3)
+
+    def test_json_items_and_pin_check(self):
+        url = '/api/accounts/wallet/bulk-transfer/'
+        items = [{'receiver_username': 'staff0', 'amount': '1.00'}]
+        response = self.client.post(url, {'pin': '0000', 'items': items}, format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(url, {'pin': '1234', 'items': items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Wallet.objects.get(user=self.staff[0]).balance, 1_00)
+
+
+@override_settings(ACCOUNT_NUMBER_BLOCK_SIZE=10)
+class AccountNumberTests(TransactionTestCase):
+    def setUp(self):
+        account_numbers.allocator.reset()
+
+    def test_numbers_are_luhn_checked_and_served_from_a_reserved_block(self):
+        self.assertEqual(account_numbers.luhn_check_digit('7992739871'), '3')
+        wallet = User.objects.create(username='alice').wallet
+        self.assertTrue(wallet.account_number.startswith('0'))
+        self.assertTrue(account_numbers.is_valid(wallet.account_number))
+        with self.assertNumQueries(0):
+            numbers = account_numbers.allocate(9)
+        numbers += account_numbers.allocate(25)
+        self.assertEqual(len({wallet.account_number, *numbers}), 35)
+        self.assertFalse(account_numbers.is_valid(numbers[0][:-1] + str((int(numbers[0][-1]) + 1) % 10)))
+
+    def test_block_reserved_in_a_transaction_is_kept_only_after_commit(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            account_numbers.allocate(2)
+            Wallet.objects.create(user_id=0)
+        self.assertEqual(account_numbers.allocator._block, [])
+        with transaction.atomic():
+            first = account_numbers.allocate(2)
+            self.assertEqual(account_numbers.allocator._block, [])
+        self.assertEqual(len(account_numbers.allocator._block), 8)
+        self.assertNotIn(account_numbers.allocate()[0], first)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher", "accounts.hashers.TransferPinHasher"],
+    TRANSFER_PIN_HASH_ITERATIONS=1,
+)
+class ImportCustomersTests(TestCase):
+    def test_import_is_bulk_and_resumable(self):
+        User.objects.create(username='existing')
+        rows = ["username,email,password,pin,phone,date_of_birth", "existing,,x,,,",
+                "cust1,c1@example.com,secret-1,1234,0700000001,1990-01-31", "cust2,,secret-2,,,", "cust1,,dup,,,"]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write("\n".join(rows))
+            f.flush()
+            call_command('import_customers', f.name, batch_size=2, workers=0, stdout=StringIO())
+            with self.assertNumQueries(2):  # one existence check per chunk, nothing inserted
+                call_command('import_customers', f.name, batch_size=2, workers=0, stdout=StringIO())
+
+        user = User.objects.get(username='cust1')
+        self.assertTrue(user.check_password('secret-1'))
+        self.assertTrue(user.profile.check_transfer_pin('1234'))
+        self.assertEqual(str(user.profile.date_of_birth), '1990-01-31')
+        self.assertEqual(Wallet.objects.filter(user__username__startswith='cust').count(), 2)
+        self.assertEqual(Profile.objects.count(), 3)
+
+
+@override_settings(WALLET_MUTATION_MAX_RETRIES=50)
+class ConcurrentTransferStressTest(TransactionTestCase):
+    """
+    Threads hammer a small set of wallets with transfers in both directions.
+    Every successful transfer must be reflected exactly once in the balances.
+    """
+    USERS = 6
+    THREADS = 8
+    TRANSFERS_PER_THREAD = 40
+    OPENING_BALANCE = 1000_00
+
+    def test_no_lost_updates(self):
+        users = [User.objects.create(username=f'stress{i}') for i in range(self.USERS)]
+        Wallet.objects.update(balance=self.OPENING_BALANCE)
+        lock = threading.Lock()
+        completed = []
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(self.TRANSFERS_PER_THREAD):
+                    sender, receiver = rng.sample(users, 2)
+                    amount = rng.randint(1, 5000)
+                    try:
+                        services.transfer(sender, receiver, amount)
+                    except services.InsufficientFunds:
+                        continue
+                    with lock:
+                        completed.append((sender.pk, receiver.pk, amount))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(self.THREADS)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+        expected = {u.pk: self.OPENING_BALANCE for u in users}
+        for sender_id, receiver_id, amount in completed:
+            expected[sender_id] -= amount
+            expected[receiver_id] += amount
+        self.assertEqual(dict(Wallet.objects.values_list('user_id', 'balance')), expected)
+        self.assertEqual(Wallet.objects.aggregate(total=Sum('balance'))['total'], self.OPENING_BALANCE * self.USERS)
+        self.assertEqual(TransactionHistory.objects.count(), 2 * len(completed))
+
+        sys.stderr.write(
+            f"\n[stress] {len(completed)} transfers across {self.THREADS} threads "
+            f"in {elapsed:.2f}s ({len(completed) / elapsed:.0f} transfers/sec) on {connection.vendor}\n"
+        )
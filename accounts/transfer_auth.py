@@ -0,0 +1,31 @@
+# accounts/transfer_auth.py
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import salted_hmac, constant_time_compare
+
+SALT = "accounts.transfer-authorization"
+SCOPES = ("transfer", "bulk_transfer")
+
+
+def _pin_fingerprint(profile):
+    # Ties a token to the PIN it was issued for: changing the PIN revokes it.
+    return salted_hmac(SALT, profile.transfer_pin or "").hexdigest()[:16]
+
+
+def issue_token(profile, scope):
+    """Signed, short-lived authorization for `scope`, issued after a PIN check."""
+    return signing.dumps({"u": profile.user_id, "s": scope, "p": _pin_fingerprint(profile)}, salt=SALT)
+
+
+def check_token(token, profile, scope):
+    """True if the token was issued to this profile, for this scope, and hasn't expired."""
+    try:
+        data = signing.loads(token, salt=SALT, max_age=settings.TRANSFER_AUTH_TOKEN_LIFETIME)
+    except signing.BadSignature:
+        return False
+    return (
+        data.get("u") == profile.user_id
+        and data.get("s") == scope
+        and constant_time_compare(data.get("p", ""), _pin_fingerprint(profile))
+    )
@@ -2,10 +2,19 @@ from django.urls import path
 from .views import (
     UserRegistrationView,
     WalletDetailView,
+    WalletCacheStatsView,
     SetTransferPinView,
+    AuthorizeTransferView,
     MakeTransferView,
+    BulkTransferView,
+    BulkTransferDetailView,
+    BulkTransferItemListView,
     TransactionHistoryListView,
+    TransactionHistoryExportView,
     TransactionPDFExportView,
+    StatementSummaryView,
+    WalletActivityView,
+    SpendingInsightsView,
     WalletTopUpView,
     WalletWithdrawView,
 )
@@ -20,14 +29,23 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     path('wallet/', WalletDetailView.as_view(), name='wallet-detail'),
+    path('wallet/cache-stats/', WalletCacheStatsView.as_view(), name='wallet-cache-stats'),
 
     path('wallet/top-up/', WalletTopUpView.as_view(), name='wallet-top-up'),
     path('wallet/withdraw/', WalletWithdrawView.as_view(), name='wallet-withdraw'),
 
     path('wallet/set-pin/', SetTransferPinView.as_view(), name='wallet-set-pin'),
+    path('wallet/authorize/', AuthorizeTransferView.as_view(), name='wallet-authorize-transfer'),
     path('wallet/transfer/', MakeTransferView.as_view(), name='wallet-transfer'),
+    path('wallet/bulk-transfer/', BulkTransferView.as_view(), name='wallet-bulk-transfer'),
+    path('wallet/bulk-transfer/<int:pk>/', BulkTransferDetailView.as_view(), name='wallet-bulk-transfer-detail'),
+    path('wallet/bulk-transfer/<int:pk>/items/', BulkTransferItemListView.as_view(), name='wallet-bulk-transfer-items'),
 
+    path('wallet/activity/', WalletActivityView.as_view(), name='wallet-activity'),
+    path('wallet/insights/', SpendingInsightsView.as_view(), name='wallet-insights'),
     path('wallet/history/', TransactionHistoryListView.as_view(), name='wallet-transaction-history'),
+    path('wallet/history/export/<str:fmt>/', TransactionHistoryExportView.as_view(), name='wallet-transaction-history-export'),
 
     path('wallet/statements/pdf/', TransactionPDFExportView.as_view(), name='wallet-statement-pdf'),
+    path('wallet/statements/summary/', StatementSummaryView.as_view(), name='wallet-statement-summary'),
 ]
\ No newline at end of file
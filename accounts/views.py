@@ -1,18 +1,34 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import transaction, IntegrityError
-from django.http import FileResponse
-
-from .models import Wallet, Profile, TransactionHistory
-from .serializers import UserSerializer, WalletSerializer, TransactionHistorySerializer
+from django.db import IntegrityError
+from django.db.models import F, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.core.files.storage import storages
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+import csv
+import itertools
+from datetime import timedelta
+
+from .models import Wallet, Profile, TransactionHistory, DailyWalletRollup, BulkDisbursement, BulkDisbursementItem
+from .serializers import (
+    UserSerializer, WalletSerializer, TransactionHistoryRowSerializer, StatementSummarySerializer,
+    WalletActivitySerializer, SpendingInsightsSerializer,
+    BulkDisbursementSerializer, BulkDisbursementItemSerializer,
+)
 from .permissions import IsOwnerOrAdmin
-from core.pdf_utils import generate_statement_pdf
+from . import analytics, archive, bulk, exports, search, services, statements, transfer_auth, wallet_cache
+from core import filters
+from core.idempotency import idempotent
+from core.money import parse_amount, to_cents
+from core.pagination import KeysetPagination
 
 
 # 🔐 JWT login using username/password
@@ -38,10 +54,17 @@ class UserRegistrationView(generics.CreateAPIView):
 class WalletDetailView(generics.RetrieveAPIView):
     serializer_class = WalletSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+    read_from_primary = True  # balances are never served stale; the snapshot cache keeps this cheap
 
     def get_object(self):
-        wallet, _ = Wallet.objects.get_or_create(user=self.request.user)
-        return wallet
+        return wallet_cache.get_snapshot(self.request.user)
+
+
+class WalletCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(wallet_cache.stats())
 
 
 class SetTransferPinView(APIView):
@@ -60,63 +83,86 @@ class SetTransferPinView(APIView):
             return Response({"detail": f"Invalid PIN: {str(e)}"}, status=400)
 
 
+def check_transfer_authorization(request, scope):
+    """
+    Verify either a `transfer_token` issued by AuthorizeTransferView or a raw
+    `pin`. Returns None when authorized, otherwise the error Response.
+    """
+    token = request.data.get("transfer_token")
+    pin = request.data.get("pin")
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        return Response({"detail": "Sender profile not found."}, status=404)
+
+    if token:
+        if not transfer_auth.check_token(token, profile, scope):
+            return Response({"detail": "Invalid or expired transfer authorization."}, status=403)
+    elif not profile.check_transfer_pin(pin):
+        return Response({"detail": "Invalid PIN."}, status=403)
+    return None
+
+
+class AuthorizeTransferView(APIView):
+    """
+    Check the transfer PIN once and issue a short-lived, scope-limited
+    authorization that follow-up transfers present instead of the PIN.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        pin = request.data.get("pin")
+        scope = request.data.get("scope", "transfer")
+
+        if not pin:
+            return Response({"detail": "PIN is required."}, status=400)
+        if scope not in transfer_auth.SCOPES:
+            return Response({"detail": f"Scope must be one of: {', '.join(transfer_auth.SCOPES)}."}, status=400)
+
+        try:
+            profile = request.user.profile
+        except Profile.DoesNotExist:
+            return Response({"detail": "Sender profile not found."}, status=404)
+        if not profile.check_transfer_pin(pin):
+            return Response({"detail": "Invalid PIN."}, status=403)
+
+        return Response({
+            "transfer_token": transfer_auth.issue_token(profile, scope),
+            "scope": scope,
+            "expires_in": settings.TRANSFER_AUTH_TOKEN_LIFETIME,
+        }, status=200)
+
+
 class MakeTransferView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         sender = request.user
         receiver_username = request.data.get("receiver_username")
         amount = request.data.get("amount")
-        pin = request.data.get("pin")
 
-        if not all([receiver_username, amount, pin]):
+        if not all([receiver_username, amount]) or not (request.data.get("pin") or request.data.get("transfer_token")):
             return Response({"detail": "Missing required fields."}, status=400)
 
         try:
             receiver = User.objects.get(username=receiver_username)
-            amount = float(amount)
-            if amount <= 0:
-                return Response({"detail": "Amount must be positive."}, status=400)
+            amount = parse_amount(amount)
         except User.DoesNotExist:
             return Response({"detail": "Receiver not found."}, status=404)
-        except ValueError:
-            return Response({"detail": "Invalid amount."}, status=400)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
 
         if sender == receiver:
             return Response({"detail": "Cannot transfer to yourself."}, status=400)
 
-        try:
-            sender_profile = sender.profile
-            if not sender_profile.check_transfer_pin(pin):
-                return Response({"detail": "Invalid PIN."}, status=403)
-        except Profile.DoesNotExist:
-            return Response({"detail": "Sender profile not found."}, status=404)
+        if denied := check_transfer_authorization(request, "transfer"):
+            return denied
 
         try:
-            with transaction.atomic():
-                sender_wallet = Wallet.objects.select_for_update().get(user=sender)
-                receiver_wallet = Wallet.objects.select_for_update().get(user=receiver)
-
-                if not sender_wallet.can_withdraw(amount):
-                    return Response({"detail": "Insufficient funds or wallet is frozen."}, status=400)
-
-                sender_wallet.balance -= amount
-                receiver_wallet.balance += amount
-                sender_wallet.save()
-                receiver_wallet.save()
-
-                TransactionHistory.objects.bulk_create([
-                    TransactionHistory(
-                        user=sender, sender=sender, receiver=receiver,
-                        amount=amount, transaction_type="transfer", status="completed",
-                        description=f"Transfer to {receiver.username}"
-                    ),
-                    TransactionHistory(
-                        user=receiver, sender=sender, receiver=receiver,
-                        amount=amount, transaction_type="transfer", status="completed",
-                        description=f"Received from {sender.username}"
-                    )
-                ])
+            services.transfer(sender, receiver, amount)
+        except services.InsufficientFunds:
+            return Response({"detail": "Insufficient funds or wallet is frozen."}, status=400)
         except Wallet.DoesNotExist:
             return Response({"detail": "Wallet not found."}, status=404)
         except Exception as e:
@@ -128,24 +174,19 @@ class MakeTransferView(APIView):
 class WalletTopUpView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
-        amount = request.data.get("amount")
         try:
-            amount = float(amount)
-            if amount <= 0:
-                return Response({"detail": "Amount must be positive."}, status=400)
-        except (TypeError, ValueError):
-            return Response({"detail": "Invalid amount."}, status=400)
-
-        wallet, _ = Wallet.objects.get_or_create(user=request.user)
-        wallet.balance += amount
-        wallet.save()
-
-        TransactionHistory.objects.create(
-            user=request.user, sender=request.user, receiver=request.user,
-            amount=amount, transaction_type="top_up", status="completed",
-            description="Wallet top-up"
-        )
+            amount = parse_amount(request.data.get("amount"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        try:
+            services.top_up(request.user, amount)
+        except Wallet.DoesNotExist:
+            return Response({"detail": "Wallet not found."}, status=404)
+        except Exception as e:
+            return Response({"detail": f"Internal error: {str(e)}"}, status=500)
 
         return Response({"detail": "Top-up successful."}, status=200)
 
@@ -153,86 +194,263 @@ class WalletTopUpView(APIView):
 class WalletWithdrawView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
-        amount = request.data.get("amount")
         try:
-            amount = float(amount)
-            if amount <= 0:
-                return Response({"detail": "Amount must be positive."}, status=400)
-        except (TypeError, ValueError):
-            return Response({"detail": "Invalid amount."}, status=400)
+            amount = parse_amount(request.data.get("amount"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
 
         try:
-            with transaction.atomic():
-                wallet = Wallet.objects.select_for_update().get(user=request.user)
+            services.withdraw(request.user, amount)
+        except services.InsufficientFunds:
+            return Response({"detail": "Insufficient funds or wallet is frozen."}, status=400)
+        except Wallet.DoesNotExist:
+            return Response({"detail": "Wallet not found."}, status=404)
+        except Exception as e:
+            return Response({"detail": f"Internal error: {str(e)}"}, status=500)
+
+        return Response({"detail": "Withdrawal successful."}, status=200)
 
-                if not wallet.can_withdraw(amount):
-                    return Response({"detail": "Insufficient funds or wallet is frozen."}, status=400)
 
-                wallet.balance -= amount
-                wallet.save()
+class BulkTransferView(APIView):
+    """
+    Pay many recipients in one request. Accepts either a JSON body
+    {"pin": "...", "items": [{"receiver_username": ..., "amount": ...}]}
+    or a multipart upload with `pin` and a `file` CSV of receiver_username,amount.
+    A bulk_transfer `transfer_token` may be sent instead of the PIN.
+    """
+    permission_classes = [IsAuthenticated]
 
-                TransactionHistory.objects.create(
-                    user=request.user, sender=request.user, receiver=request.user,
-                    amount=amount, transaction_type="withdraw", status="completed",
-                    description="Wallet withdrawal"
-                )
+    def post(self, request):
+        upload = request.FILES.get("file")
+        items = request.data.get("items")
+
+        if not (request.data.get("pin") or request.data.get("transfer_token")) or (
+            upload is None and not isinstance(items, list)
+        ):
+            return Response({"detail": "Provide a PIN and either an items list or a CSV file."}, status=400)
+
+        if denied := check_transfer_authorization(request, "bulk_transfer"):
+            return denied
+
+        rows = bulk.iter_csv_rows(upload) if upload is not None else bulk.iter_json_rows(items)
+        try:
+            batch = bulk.run_disbursement(request.user, rows)
         except Wallet.DoesNotExist:
             return Response({"detail": "Wallet not found."}, status=404)
+        except (UnicodeDecodeError, csv.Error):
+            return Response({"detail": "File must be a UTF-8 CSV."}, status=400)
         except Exception as e:
             return Response({"detail": f"Internal error: {str(e)}"}, status=500)
 
-        return Response({"detail": "Withdrawal successful."}, status=200)
+        return Response(BulkDisbursementSerializer(batch).data, status=201)
 
 
-class TransactionHistoryListView(generics.ListAPIView):
-    serializer_class = TransactionHistorySerializer
+class BulkTransferDetailView(generics.RetrieveAPIView):
+    serializer_class = BulkDisbursementSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        qs = TransactionHistory.objects.filter(user=user).order_by('-timestamp')
+        return BulkDisbursement.objects.filter(user=self.request.user)
 
-        params = self.request.query_params
-        if tx_type := params.get("type"):
-            qs = qs.filter(transaction_type=tx_type)
-        if min_amt := params.get("min_amount"):
-            try:
-                qs = qs.filter(amount__gte=float(min_amt))
-            except ValueError:
-                pass
-        if max_amt := params.get("max_amount"):
+
+class BulkTransferItemListView(generics.ListAPIView):
+    serializer_class = BulkDisbursementItemSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return BulkDisbursementItem.objects.filter(
+            batch_id=self.kwargs['pk'], batch__user=self.request.user
+        ).order_by('row_number')
+
+
+def history_criteria(params):
+    """The history query params (type, amount and date range) shared by the list and export views, parsed."""
+    criteria = {}
+    if tx_type := params.get("type"):
+        criteria['transaction_type'] = tx_type
+    for name in ("min_amount", "max_amount"):
+        if value := params.get(name):
             try:
-                qs = qs.filter(amount__lte=float(max_amt))
+                criteria[name] = to_cents(value)
             except ValueError:
                 pass
-        if start_date := params.get("start_date"):
-            qs = qs.filter(timestamp__date__gte=start_date)
-        if end_date := params.get("end_date"):
-            qs = qs.filter(timestamp__date__lte=end_date)
+    try:
+        criteria['bounds'] = filters.date_bounds(params.get("start_date"), params.get("end_date"))
+    except ValueError:
+        pass
+    return criteria
+
+
+def filter_history(qs, params):
+    """Apply history_criteria(params) to a TransactionHistory queryset."""
+    criteria = history_criteria(params)
+    if 'transaction_type' in criteria:
+        qs = qs.filter(transaction_type=criteria['transaction_type'])
+    if 'min_amount' in criteria:
+        qs = qs.filter(amount__gte=criteria['min_amount'])
+    if 'max_amount' in criteria:
+        qs = qs.filter(amount__lte=criteria['max_amount'])
+    if 'bounds' in criteria:
+        qs = filters.filter_range(qs, 'timestamp', criteria['bounds'])
+    return qs
+
 
-        return qs
+class TransactionHistoryListView(generics.ListAPIView):
+    """
+    The customer's history, newest first, continuing into archived months
+    once the hot rows run out, or with ?q= the hot rows whose description
+    or counterparty matches every word, most relevant first.
+    """
+    serializer_class = TransactionHistoryRowSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = 'timestamp'
+    query_budget = 2  # the page, and the archive index when the page reaches past the hot rows
+
+    def get_queryset(self):
+        qs = filter_history(TransactionHistory.objects.filter(user=self.request.user), self.request.query_params)
+        if q := self.request.query_params.get('q'):
+            self.keyset_field = 'rank'
+            return TransactionHistoryRowSerializer.values(search.search(qs, q, self.request.user.pk), 'rank')
+        return TransactionHistoryRowSerializer.values(qs)
+
+    def older_rows(self, boundary):
+        """Archived rows before boundary, a (timestamp, id) key or None, for KeysetPagination."""
+        if self.keyset_field != 'timestamp':
+            return
+        user = self.request.user
+        for row in archive.user_rows(user.pk, **history_criteria(self.request.query_params)):
+            if boundary is None or (row['timestamp'], row['id']) < boundary:
+                yield dict(archive.as_history_row(row), user_username=user.username)
 
 
-class TransactionPDFExportView(APIView):
+class TransactionHistoryExportView(APIView):
+    """
+    Stream the whole (optionally filtered) history, archived months
+    first, as CSV or NDJSON, gzip-encoded when the client accepts it. Staff may export another
+    customer's history with ?username=.
+    """
+    permission_classes = [IsAuthenticated]
+    content_types = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+    def get(self, request, fmt):
+        if fmt not in self.content_types:
+            return Response({"detail": "Export format must be csv or ndjson."}, status=400)
+        user = request.user
+        if (username := request.query_params.get('username')) and request.user.is_staff:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                return Response({"detail": "User not found."}, status=404)
+
+        qs = filter_history(TransactionHistory.objects.filter(user=user), request.query_params)
+        archived = archive.user_rows(user.pk, newest_first=False, **history_criteria(request.query_params))
+        rows = itertools.chain(exports.archived_rows(archived), exports.history_rows(qs, settings.EXPORT_CHUNK_SIZE))
+        lines = exports.csv_lines(rows) if fmt == 'csv' else exports.ndjson_lines(rows)
+        compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+        response = StreamingHttpResponse(exports.encode(lines, compress), content_type=self.content_types[fmt])
+        response['Content-Disposition'] = f'attachment; filename="history_{user.username}.{fmt}"'
+        response['Vary'] = 'Accept-Encoding'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+
+class WalletActivityView(APIView):
+    """
+    Chart data from DailyWalletRollup: count, total, min and max per
+    transaction type and direction for each day, week or month (?bucket=)
+    between ?start_date= and ?end_date= (default: the last 30 days).
+    """
+    permission_classes = [IsAuthenticated]
+    buckets = {'day': F('date'), 'week': TruncWeek('date'), 'month': TruncMonth('date')}
+    default_days = 30
+
+    def get(self, request):
+        params = request.query_params
+        bucket = params.get('bucket', 'day')
+        if bucket not in self.buckets:
+            return Response({"detail": "bucket must be day, week or month."}, status=400)
+        try:
+            end = filters.parse_date(params['end_date']) if params.get('end_date') else timezone.localdate()
+            start = (filters.parse_date(params['start_date']) if params.get('start_date')
+                     else end - timedelta(days=self.default_days - 1))
+        except ValueError:
+            return Response({"detail": "Dates must be YYYY-MM-DD."}, status=400)
+
+        rollups = DailyWalletRollup.objects.filter(user=request.user, date__range=(start, end))
+        if tx_type := params.get('type'):
+            rollups = rollups.filter(transaction_type=tx_type)
+        rows = (
+            rollups.annotate(period=self.buckets[bucket])
+            .values('period', 'transaction_type', 'direction')
+            .annotate(rows=Sum('count'), amount=Sum('total'), smallest=Min('min_amount'), largest=Max('max_amount'))
+            .order_by('period', 'transaction_type', 'direction')
+        )
+        return Response({
+            'bucket': bucket,
+            'start_date': start,
+            'end_date': end,
+            'results': WalletActivitySerializer(rows, many=True).data,
+        })
+
+
+class SpendingInsightsView(APIView):
+    """Average daily spend, 30-day burn rate, top counterparties and spending spikes (accounts.analytics)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(SpendingInsightsSerializer(analytics.spending_insights(request.user.pk)).data)
+
+
+def statement_period(params):
+    """(year, month) from the month and year query params. Raises ValueError if either is missing or invalid."""
+    try:
+        month, year = int(params.get('month')), int(params.get('year'))
+    except TypeError:
+        raise ValueError("month and year are required")
+    filters.month_bounds(year, month)  # rejects months outside 1-12
+    return year, month
+
+
+class StatementSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
-            month = int(request.query_params.get('month'))
-            year = int(request.query_params.get('year'))
-        except (TypeError, ValueError):
+            year, month = statement_period(request.query_params)
+        except ValueError:
             return Response({"detail": "Month and year must be integers."}, status=400)
+        return Response(StatementSummarySerializer(statements.summary(request.user.pk, year, month)).data)
 
-        txs = TransactionHistory.objects.filter(
-            user=request.user,
-            timestamp__month=month,
-            timestamp__year=year
-        )
 
-        if not txs.exists():
+class TransactionPDFExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            year, month = statement_period(request.query_params)
+        except ValueError:
+            return Response({"detail": "Month and year must be integers."}, status=400)
+
+        version = statements.version(request.user.pk, year, month)
+        if version is None:
             return Response({"detail": "No transactions found."}, status=404)
 
-        pdf_buffer = generate_statement_pdf(request.user, txs, month, year)
-        filename = f"statement_{request.user.username}_{month}_{year}.pdf"
-        return FileResponse(pdf_buffer, as_attachment=True, filename=filename, content_type='application/pdf')
+        etag = f'"{statements.etag(request.user.pk, year, month, version)}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                pdf = storages['private'].open(statements.render(request.user, year, month, version), 'rb')
+            except FileNotFoundError:
+                # Removed by a concurrent render of the month; store it again.
+                pdf = storages['private'].open(statements.render(request.user, year, month, version), 'rb')
+            filename = f"statement_{request.user.username}_{month}_{year}.pdf"
+            response = FileResponse(pdf, as_attachment=True,
+                                    filename=filename, content_type='application/pdf')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
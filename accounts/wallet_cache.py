@@ -0,0 +1,92 @@
+# accounts/wallet_cache.py
+"""
+Versioned read-through cache for the wallet endpoint.
+
+Every balance mutation bumps Wallet.version in the same UPDATE and, while
+the transaction still holds the wallet's row lock, points
+wallet:<user>:version at the new version. Snapshots are stored under
+wallet:<user>:v<version> and are only ever filled from a committed row of
+that exact version, so a reader that finds both keys can answer without
+touching the database, and a reader after a change always misses.
+
+Hot (sharded) wallets take credits without touching the wallet row, so
+their pointer is HOT and reads go straight to the database.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Wallet
+
+HOT = 'hot'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f"wallet:{user_id}:version"
+
+
+def _snapshot_key(user_id, version):
+    return f"wallet:{user_id}:v{version}"
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """Hit/miss counters for this process."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+def publish(versions):
+    """
+    Point readers at new versions: versions maps user_id -> (version,
+    shard_count). Call inside the mutating transaction, after the UPDATE,
+    so row locks order the pointer writes the same way as the versions.
+    """
+    cache.set_many(
+        {_version_key(user_id): HOT if shard_count else version for user_id, (version, shard_count) in versions.items()},
+        timeout=settings.WALLET_CACHE_TTL,
+    )
+
+
+def publish_current(user_id):
+    """publish() for a wallet whose new version wasn't loaded by the caller."""
+    row = Wallet.objects.filter(user_id=user_id).values_list('version', 'shard_count').first()
+    if row is not None:
+        publish({user_id: row})
+
+
+def get_snapshot(user):
+    """
+    Return the wallet read model for a user: a dict with id, total_balance
+    and created_at, suitable for WalletSerializer.
+    """
+    version = cache.get(_version_key(user.pk))
+    if version is not None and version != HOT:
+        snapshot = cache.get(_snapshot_key(user.pk, version))
+        if snapshot is not None:
+            _count('hits')
+            return snapshot
+
+    _count('misses')
+    wallet = Wallet.objects.filter(user=user).first()
+    if wallet is None:
+        wallet, _ = Wallet.objects.get_or_create(user=user)
+    snapshot = {'id': wallet.pk, 'total_balance': wallet.total_balance, 'created_at': wallet.created_at}
+    if wallet.shard_count:
+        cache.add(_version_key(user.pk), HOT, timeout=settings.WALLET_CACHE_TTL)
+        return snapshot
+    cache.set(_snapshot_key(user.pk, wallet.version), snapshot, timeout=settings.WALLET_CACHE_TTL)
+    # add(), not set(): a mutation may have published a newer version since the row was read.
+    cache.add(_version_key(user.pk), wallet.version, timeout=settings.WALLET_CACHE_TTL)
+    return snapshot
@@ -1,12 +1,19 @@
 from django.contrib import admin
+from core.paginator import EstimatedCountPaginator
 from .models import AdminActionLog
 
 @admin.register(AdminActionLog)
 class AdminActionLogAdmin(admin.ModelAdmin):
     list_display = ('admin_user', 'action', 'target_user', 'loan', 'transaction', 'timestamp')
+    # Loan and MpesaTransaction __str__ both read their user.
+    list_select_related = ('admin_user', 'target_user', 'loan__user', 'transaction__user')
     list_filter = ('action', 'timestamp')
+    date_hierarchy = 'timestamp'
     search_fields = ('admin_user__username', 'target_user__username', 'notes')
     readonly_fields = ('timestamp',)
+    autocomplete_fields = ('admin_user', 'target_user', 'loan', 'transaction')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
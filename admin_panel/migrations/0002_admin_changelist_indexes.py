@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0001_initial'),
+        ('loans', '0005_keyset_indexes'),
+        ('mpesa', '0005_admin_changelist_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminactionlog',
+            index=models.Index(fields=['timestamp', 'id'], name='admin_action_ts_id_idx'),
+        ),
+    ]
@@ -60,6 +60,9 @@ class AdminActionLog(models.Model):
         ordering = ['-timestamp']
         verbose_name = 'Admin Action Log'
         verbose_name_plural = 'Admin Action Logs'
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='admin_action_ts_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.admin_user.username} performed {self.get_action_display()} on {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -35,8 +35,9 @@ class TransactionSerializer(serializers.ModelSerializer):
 
 
 class AdminActionLogSerializer(serializers.ModelSerializer):
-    admin_user = serializers.StringRelatedField()
-    target_user = serializers.StringRelatedField()
+    # Querysets should select_related('admin_user', 'target_user', 'loan__user').
+    admin_user = serializers.CharField(source='admin_user.username', read_only=True)
+    target_user = serializers.CharField(source='target_user.username', read_only=True, allow_null=True)
     loan = serializers.StringRelatedField()
 
     class Meta:
@@ -0,0 +1,146 @@
+# core/db_router.py
+"""
+Primary/replica database routing with read-your-writes.
+
+Writes always go to the primary ("default"). Reads go to the "replica"
+alias only while ReplicaRoutingMiddleware is serving a safe-method request
+(GET, HEAD, OPTIONS) and DATABASE_REPLICA_READS is on, so migrations,
+management commands, Celery tasks and tests read from the primary.
+
+A request that writes pins its user to the primary for
+READ_YOUR_WRITES_SECONDS through a cache key, which must therefore be in a
+cache shared by every worker; the rest of that request reads from the
+primary too. A customer who has just paid never reads their balance or
+history from a replica that hasn't caught up. Views that must always read
+the primary set `read_from_primary = True` (function views: the
+read_from_primary decorator).
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+PRIMARY, REPLICA = 'default', 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_jwt = JWTAuthentication()
+
+
+class _Routing:
+    """Per-request routing state: whether reads may use the replica, and whether anything was written."""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = False
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def _pin_key(user_id):
+    return f"db:primary-pin:{user_id}"
+
+
+def pin(user_id):
+    cache.set(_pin_key(user_id), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def read_from_primary(view):
+    """Mark a function view as always reading from the primary."""
+    view.read_from_primary = True
+    return view
+
+
+def request_user_id(request):
+    """
+    The requesting user's id from a valid JWT bearer token or the session,
+    without touching the user table; None for anonymous requests.
+    """
+    try:
+        header = _jwt.get_header(request)
+        raw = _jwt.get_raw_token(header) if header is not None else None
+        if raw is not None:
+            return str(_jwt.get_validated_token(raw)[jwt_settings.USER_ID_CLAIM])
+    except (AuthenticationFailed, InvalidToken, KeyError):
+        return None
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        return REPLICA if routing is not None and routing.replica else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.replica = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows.
+        return True
+
+
+def _bound(routing, content):
+    """Iterate streamed response content with the request's routing still in effect."""
+    content = iter(content)
+    while True:
+        token = _routing.set(routing)
+        try:
+            chunk = next(content)
+        except StopIteration:
+            return
+        finally:
+            _routing.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Chooses the read database for each request (see module docstring) once
+    the view is known, and pins users who wrote. Goes after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = _Routing()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote and settings.DATABASE_REPLICA_READS and (user_id := request_user_id(request)) is not None:
+            pin(user_id)
+        if response.streaming and routing.replica:
+            response.streaming_content = _bound(routing, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is None or routing.wrote or request.method not in SAFE_METHODS:
+            return None
+        if not settings.DATABASE_REPLICA_READS:
+            return None
+        view = getattr(view_func, 'view_class', view_func)
+        if getattr(view, 'read_from_primary', False):
+            return None
+        user_id = request_user_id(request)
+        routing.replica = user_id is None or not is_pinned(user_id)
+        return None
@@ -0,0 +1,54 @@
+# core/filters.py
+"""
+Calendar filters as half-open UTC timestamp ranges.
+
+Lookups like timestamp__date, __month and __year make the database convert
+every row's timestamp to TIME_ZONE before comparing, so no index on the
+column can be used. These helpers turn local calendar dates, months and
+years into [start, end) bounds on the raw column instead, which a
+(user, timestamp) index can range-scan.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+
+def parse_date(value):
+    """A date from a date or "YYYY-MM-DD" string. Raises ValueError otherwise."""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def local_midnight(day):
+    """The UTC instant at which `day` starts in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min)).astimezone(dt_timezone.utc)
+
+
+def date_bounds(start=None, end=None):
+    """[start, end) for inclusive local dates; either side may be None."""
+    return (
+        local_midnight(parse_date(start)) if start else None,
+        local_midnight(parse_date(end) + timedelta(days=1)) if end else None,
+    )
+
+
+def month_bounds(year, month):
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return local_midnight(first), local_midnight(following)
+
+
+def year_bounds(year):
+    return local_midnight(date(year, 1, 1)), local_midnight(date(year + 1, 1, 1))
+
+
+def filter_range(queryset, field, bounds):
+    """Apply [start, end) bounds from the helpers above to a timestamp field."""
+    start, end = bounds
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
@@ -0,0 +1,165 @@
+# core/idempotency.py
+"""Idempotency-Key support for money-moving endpoints."""
+
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from accounts import services
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Credentials are left out of the stored fingerprint so a short PIN can't be
+# brute-forced from it; the key is already scoped to the authenticated user.
+UNHASHED_FIELDS = {'pin', 'transfer_token'}
+
+
+def _cache_key(user_id, key):
+    return f"idempotency:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def _fingerprint(request):
+    data = request.data
+    data = dict(data.lists()) if hasattr(data, 'lists') else data
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in UNHASHED_FIELDS}
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(recorded, request_hash):
+    if recorded['request_hash'] != request_hash:
+        return Response({"detail": f"{HEADER} was already used with a different request."}, status=422)
+    response = Response(recorded['body'], status=recorded['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _acquire(user, key, request_hash):
+    """
+    Claim the key for this request. Returns (response, None) when a response
+    should be sent without running the view (a replay, a mismatch or a
+    timeout waiting on a duplicate), or (None, row) once the key is ours.
+    """
+    cache_key = _cache_key(user.pk, key)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.01
+    while True:
+        recorded = cache.get(cache_key)
+        if recorded is not None:
+            return _replay(recorded, request_hash), None
+
+        now = timezone.now()
+        lease = now + timedelta(seconds=settings.IDEMPOTENCY_PROCESSING_LEASE)
+        try:
+            with transaction.atomic():
+                row = IdempotencyKey.objects.create(user=user, key=key, request_hash=request_hash, expires_at=lease)
+            return None, row
+        except IntegrityError:
+            pass
+
+        row = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if row is None:
+            # The holder failed and released the key; try to claim it again.
+            continue
+        if row.expires_at <= now:
+            # Expired keys (and leases left behind by a crashed worker) are taken over in place.
+            taken = IdempotencyKey.objects.filter(pk=row.pk, expires_at=row.expires_at).update(
+                request_hash=request_hash, status='processing', response_status=None, response_body=None,
+                expires_at=lease,
+            )
+            if taken:
+                row.refresh_from_db()
+                return None, row
+            continue
+        if row.request_hash != request_hash:
+            return _replay({'request_hash': row.request_hash}, request_hash), None
+        if row.status == 'completed':
+            recorded = {'request_hash': row.request_hash, 'status': row.response_status, 'body': row.response_body}
+            cache.set(cache_key, recorded, timeout=max(1, int((row.expires_at - now).total_seconds())))
+            return _replay(recorded, request_hash), None
+
+        if time.monotonic() >= deadline:
+            response = Response({"detail": f"A request with this {HEADER} is still being processed."}, status=409)
+            response['Retry-After'] = '1'
+            return response, None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+class _LeaseLost(Exception):
+    """The key's lease ran out mid-request and another request took it over."""
+
+
+def _record(row, response):
+    """
+    Complete the key inside the view's transaction; the cache is filled
+    once it commits. Raises _LeaseLost if the key is no longer ours, which
+    rolls the view's writes back.
+    """
+    ttl = settings.IDEMPOTENCY_KEY_TTL
+    recorded = IdempotencyKey.objects.filter(pk=row.pk, status='processing', expires_at=row.expires_at).update(
+        status='completed',
+        response_status=response.status_code,
+        response_body=response.data,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+    if not recorded:
+        raise _LeaseLost
+    body = {'request_hash': row.request_hash, 'status': response.status_code, 'body': response.data}
+    transaction.on_commit(lambda: cache.set(_cache_key(row.user_id, row.key), body, timeout=ttl))
+
+
+def idempotent(view_method):
+    """
+    Decorator for APIView handlers. Requests without the header run as
+    usual. Error responses and exceptions roll back the view's writes and
+    release the key so the client can retry; anything else is recorded,
+    in the view's transaction, and replayed for IDEMPOTENCY_KEY_TTL.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters."}, status=400)
+
+        response, row = _acquire(request.user, key, _fingerprint(request))
+        if response is not None:
+            return response
+
+        def attempt():
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 400:
+                transaction.set_rollback(True)
+            else:
+                _record(row, response)
+            return response
+
+        try:
+            # Retried as one unit: the wallet services can't retry inside this transaction.
+            response = services.run_atomic(attempt)
+        except _LeaseLost:
+            response = Response({"detail": f"A request with this {HEADER} is still being processed."}, status=409)
+            response['Retry-After'] = '1'
+            return response
+        except Exception:
+            IdempotencyKey.objects.filter(pk=row.pk).delete()
+            raise
+        if response.status_code >= 400:
+            IdempotencyKey.objects.filter(pk=row.pk).delete()
+        return response
+
+    return wrapper
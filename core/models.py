@@ -1,3 +1,82 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class DirtyFieldsMixin:
+    """
+    Remembers the concrete field values an instance was loaded or last saved
+    with, so callers can write back only the fields that actually changed.
+    Must come before models.Model in the bases.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember()
+        return instance
+
+    def _remember(self, attnames=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (attnames is None or field.attname in attnames):
+                loaded[field.attname] = self.__dict__[field.attname]
+
+    def dirty_fields(self):
+        """Names of the concrete fields changed since the last load or save."""
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None:
+            return [f.name for f in self._meta.concrete_fields if not f.primary_key]
+        return [
+            f.name for f in self._meta.concrete_fields
+            if f.attname in self.__dict__ and (f.attname not in loaded or self.__dict__[f.attname] != loaded[f.attname])
+        ]
+
+    def _attnames(self, names):
+        return None if names is None else {getattr(self._meta.get_field(name), 'attname', name) for name in names}
+
+    def save_dirty(self):
+        """Save only the changed fields; issues no query when nothing changed. Returns the fields written."""
+        dirty = self.dirty_fields()
+        if self._state.adding:
+            self.save()
+        elif dirty:
+            self.save(update_fields=dirty)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember(self._attnames(kwargs.get('update_fields')))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._remember(self._attnames(fields))
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied Idempotency-Key and the response recorded for it.
+    The row is claimed (status=processing) before the view runs, so a
+    concurrent duplicate finds it and waits instead of redoing the work.
+    """
+    STATUS_CHOICES = (
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status})"
@@ -0,0 +1,72 @@
+# core/money.py
+"""
+Money is stored and computed as integer minor units (cents) everywhere:
+BigIntegerField columns, int arithmetic and plain integer SUMs. Request
+input is parsed exactly into cents and amounts are turned back into
+display strings only at the serializer / rendering edge.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import serializers
+
+CENTS_PER_UNIT = 100
+# Largest amount accepted from input; well inside BigIntegerField, with room left for totals.
+MAX_CENTS = 10 ** 15
+
+
+def to_cents(value):
+    """
+    Parse a major-unit amount ("12.50", 12, Decimal("12.5")) into integer
+    cents without going through float. Raises ValueError for anything that
+    isn't an exact amount with at most two decimal places, or is larger
+    than MAX_CENTS.
+    """
+    if isinstance(value, bool):
+        raise ValueError("Invalid amount.")
+    try:
+        amount = Decimal(str(value).strip()) * CENTS_PER_UNIT
+    except InvalidOperation:
+        raise ValueError("Invalid amount.")
+    if not amount.is_finite() or amount != amount.to_integral_value():
+        raise ValueError("Invalid amount.")
+    if abs(amount) > MAX_CENTS:
+        raise ValueError("Amount is too large.")
+    return int(amount)
+
+
+def parse_amount(raw):
+    """Parse a request amount into a positive number of cents."""
+    cents = to_cents(raw)
+    if cents <= 0:
+        raise ValueError("Amount must be positive.")
+    return cents
+
+
+def format_cents(cents, grouping=False):
+    """12345 -> "123.45" (or "1,234.50" with grouping)."""
+    sign = "-" if cents < 0 else ""
+    units, minor = divmod(abs(int(cents)), CENTS_PER_UNIT)
+    units = f"{units:,}" if grouping else str(units)
+    return f"{sign}{units}.{minor:02d}"
+
+
+def format_kes(cents):
+    return f"KSh {format_cents(cents, grouping=True)}"
+
+
+class MoneyField(serializers.Field):
+    """Serializer field for cent amounts: a "1234.50" string on the wire."""
+
+    default_error_messages = {
+        'invalid': "Invalid amount.",
+    }
+
+    def to_representation(self, value):
+        return format_cents(value)
+
+    def to_internal_value(self, data):
+        try:
+            return to_cents(data)
+        except ValueError:
+            self.fail('invalid')
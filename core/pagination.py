@@ -0,0 +1,109 @@
+# core/pagination.py
+
+import base64
+import itertools
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first cursor pagination on (keyset_field, id).
+
+    Each page is a single index range scan: there is no COUNT(*) and no
+    OFFSET, so a deep page costs the same as the first one. Responses carry
+    an opaque `next` link and `has_more` instead of a total count. Views
+    paginating on something other than `timestamp` set `keyset_field`,
+    which may be a datetime or a number (e.g. a search rank).
+
+    A view whose rows continue outside the queryset (e.g. in archive files)
+    defines older_rows(boundary): an iterator of row dicts ordered after
+    boundary, the (value, id) key of the last row shown or None. It is read
+    only when the queryset runs out before the page is full.
+    """
+    keyset_field = 'timestamp'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_page_size(self, request):
+        default = api_settings.PAGE_SIZE or 10
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except ValueError:
+            return default
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value, pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, (int, float)):
+                raise TypeError
+            return value, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        field = getattr(view, 'keyset_field', self.keyset_field)
+        page_size = self.get_page_size(request)
+        self.request = request
+
+        queryset = queryset.order_by(f'-{field}', '-id')
+        if cursor := request.query_params.get(self.cursor_query_param):
+            value, pk = self.decode_cursor(cursor)
+            # "<= value" gives the planner an index range; the OR only breaks ties.
+            queryset = queryset.filter(**{f'{field}__lte': value}).filter(
+                Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        if len(rows) <= page_size and hasattr(view, 'older_rows'):
+            boundary = self._key(rows[-1], field) if rows else (value, pk) if cursor else None
+            rows += itertools.islice(view.older_rows(boundary), page_size + 1 - len(rows))
+        self.has_more = len(rows) > page_size
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(*self._key(page[-1], field)) if self.has_more else None
+        return page
+
+    @staticmethod
+    def _key(row, field):
+        if isinstance(row, dict):
+            return row[field], row['id']
+        return getattr(row, field), row.pk
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'has_more': self.has_more,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['has_more', 'results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'has_more': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
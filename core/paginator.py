@@ -0,0 +1,40 @@
+# core/paginator.py
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_rows(model, using='default'):
+    """
+    Row count for a whole table: the planner's statistics on PostgreSQL
+    (None before the first ANALYZE), an exact COUNT(*) elsewhere. Rows do get deleted (history archiving
+    removes whole months), so the highest primary key is no estimate.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None  # -1: never analysed
+    return model._default_manager.using(using).order_by().count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator for large tables. An unfiltered list is
+    counted from estimated_rows(); a filtered one is counted exactly but
+    only up to ADMIN_EXACT_COUNT_LIMIT rows, so the last pages of a huge
+    result are reached by refining the filter rather than paging.
+    Small tables are always counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset, limit = self.object_list, settings.ADMIN_EXACT_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
@@ -1,39 +1,164 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from io import BytesIO
+# core/pdf_utils.py
+"""
+Monthly statement PDFs, written page by page.
+
+reportlab keeps the uncompressed content of every finished page in memory
+until save(), which grows with the statement (about 4 MiB per 10k rows).
+This renderer writes each page to the output file as soon as it is full,
+so memory stays at one page plus an offset per PDF object. The page chrome
+(title, customer, period and column headings) is drawn once as a form
+XObject, and each page paints it with a single Do operator. Rows are read
+as tuples through a server-side cursor. See bench_statement_pdf for time
+and memory per 10k rows.
+"""
+
+import itertools
+import tempfile
+import zlib
 from datetime import datetime
 
-def generate_statement_pdf(user, transactions, month, year):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(100, 800, f"SmartBank360 - Transaction Statement")
-    p.setFont("Helvetica", 12)
-    p.drawString(100, 780, f"User: {user.username}")
-    p.drawString(100, 765, f"Month: {month} / {year}")
-    p.drawString(100, 750, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-    y = 720
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(100, y, "Date")
-    p.drawString(200, y, "Type")
-    p.drawString(300, y, "Amount")
-    p.drawString(400, y, "Status")
-    p.line(90, y-5, 500, y-5)
-
-    p.setFont("Helvetica", 10)
-    for txn in transactions:
-        y -= 20
-        if y < 100:
-            p.showPage()
-            y = 780
-        p.drawString(100, y, txn.timestamp.strftime('%Y-%m-%d'))
-        p.drawString(200, y, txn.type.capitalize())
-        p.drawString(300, y, f"KES {txn.amount}")
-        p.drawString(400, y, txn.status.capitalize())
-
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    return buffer
+from django.utils import timezone
+
+from core.money import format_cents
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 in points
+FIRST_ROW_Y = 700
+LAST_ROW_Y = 100
+ROW_HEIGHT = 20
+CHUNK_SIZE = 2000
+
+# Fixed object numbers; pages take two objects each (content, page) from FIRST_PAGE_OBJECT.
+CATALOG, PAGES, FONT, BOLD_FONT, CHROME = 1, 2, 3, 4, 5
+FIRST_PAGE_OBJECT = 6
+
+
+def _text(value):
+    # The fonts use WinAnsiEncoding, which is cp1252; characters outside it print as '?'.
+    value = str(value).encode('cp1252', 'replace')
+    return b"(" + value.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _show(font, size, x, y, value):
+    return b"/%s %d Tf 1 0 0 1 %d %d Tm %s Tj\n" % (font, size, x, y, _text(value))
+
+
+class _PDFWriter:
+    """Writes numbered objects straight to a binary file and remembers only their offsets."""
+
+    def __init__(self, output):
+        self.output = output
+        self.offsets = {}
+        self.position = 0
+        self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write(self, data):
+        self.output.write(data)
+        self.position += len(data)
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        self.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def stream(self, number, content, entries=b""):
+        data = zlib.compress(content)
+        self.object(number, b"<< %s /Length %d /Filter /FlateDecode >>\nstream\n" % (entries, len(data))
+                    + data + b"\nendstream")
+
+    def close(self, root):
+        xref = self.position
+        size = max(self.offsets) + 1
+        self.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for number in range(1, size):
+            self.write(b"%010d 00000 n \n" % self.offsets[number])
+        self.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, root, xref))
+
+
+def _chrome(user, month, year):
+    return b"".join([
+        b"BT\n",
+        _show(b"F2", 16, 100, 800, "SmartBank360 - Transaction Statement"),
+        _show(b"F1", 12, 100, 780, f"User: {user.username}"),
+        _show(b"F1", 12, 100, 765, f"Month: {month} / {year}"),
+        _show(b"F1", 12, 100, 750, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"),
+        _show(b"F2", 10, 100, 720, "Date"),
+        _show(b"F2", 10, 200, 720, "Type"),
+        _show(b"F2", 10, 300, 720, "Amount"),
+        _show(b"F2", 10, 400, 720, "Status"),
+        b"ET\n90 715 m 500 715 l S\n",
+    ])
+
+
+def _row_cells(rows, type_labels):
+    for timestamp, tx_type, amount, status in rows:
+        yield [
+            (100, timezone.localtime(timestamp).strftime('%Y-%m-%d')),
+            (200, type_labels.get(tx_type, tx_type)),
+            (300, f"KES {format_cents(amount)}"),
+            (400, status.capitalize()),
+        ]
+
+
+def _summary_cells(summary, type_labels):
+    yield []
+    yield [(100, "Opening balance"), (300, f"KES {format_cents(summary['opening_balance'])}")]
+    for tx_type, total in summary['totals'].items():
+        yield [(100, f"{type_labels.get(tx_type, tx_type)} total"), (300, f"KES {format_cents(total)}")]
+    yield [(100, "Closing balance"), (300, f"KES {format_cents(summary['closing_balance'])}")]
+    yield [(100, ", ".join(f"{status.capitalize()}: {count}" for status, count in summary['statuses'].items()))]
+
+
+def generate_statement_pdf(user, transactions, month, year, output=None, summary=None, type_labels=None):
+    """
+    Render a TransactionHistory queryset (already filtered to the month and
+    ordered), or an iterable of (timestamp, transaction_type, amount, status)
+    tuples with their type_labels, into output, a binary file opened for
+    writing, or a new temporary file, followed by the summary from
+    accounts.statements.summary() if given. Returns the file rewound to the
+    start.
+    """
+    output = output if output is not None else tempfile.TemporaryFile()
+    if hasattr(transactions, 'values_list'):
+        type_labels = dict(transactions.model._meta.get_field('transaction_type').flatchoices)
+        rows = transactions.values_list('timestamp', 'transaction_type', 'amount', 'status').iterator(
+            chunk_size=CHUNK_SIZE
+        )
+    else:
+        rows = transactions
+
+    pdf = _PDFWriter(output)
+    fonts = b"/Font << /F1 %d 0 R /F2 %d 0 R >>" % (FONT, BOLD_FONT)
+    pdf.object(FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pdf.object(BOLD_FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    pdf.stream(CHROME, _chrome(user, month, year),
+               b"/Type /XObject /Subtype /Form /BBox [0 0 %.2f %.2f] /Resources << %s >>"
+               % (PAGE_WIDTH, PAGE_HEIGHT, fonts))
+    page = (b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << %s /XObject << /Chrome %d 0 R >> >> /Contents %%d 0 R >>"
+            % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, fonts, CHROME))
+    pages = 0
+
+    def finish_page(lines):
+        nonlocal pages
+        content = FIRST_PAGE_OBJECT + 2 * pages
+        pdf.stream(content, b"/Chrome Do\nBT\n" + b"".join(lines) + b"ET\n")
+        pdf.object(content + 1, page % content)
+        pages += 1
+
+    cells = _row_cells(rows, type_labels)
+    if summary is not None:
+        cells = itertools.chain(cells, _summary_cells(summary, type_labels))
+    lines, y = [], FIRST_ROW_Y
+    for row in cells:
+        if y < LAST_ROW_Y:
+            finish_page(lines)
+            lines, y = [], FIRST_ROW_Y
+        lines += [_show(b"F1", 10, x, y, value) for x, value in row]
+        y -= ROW_HEIGHT
+    finish_page(lines)
+
+    kids = b" ".join(b"%d 0 R" % (FIRST_PAGE_OBJECT + 2 * i + 1) for i in range(pages))
+    pdf.object(PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages))
+    pdf.object(CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES)
+    pdf.close(CATALOG)
+    output.seek(0)
+    return output
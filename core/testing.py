@@ -0,0 +1,32 @@
+# core/testing.py
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for list endpoints that declare a `query_budget`: the
+    number of queries one request may issue, whatever the page size.
+    """
+    budget_page_sizes = (1, 10, 100)
+
+    def assertWithinQueryBudget(self, url, budget=None, page_sizes=None):
+        """
+        GET url at several page sizes and fail if any response issues more
+        queries than the budget (by default the view's query_budget).
+        A per-row query shows up as soon as a page holds more than one row.
+        """
+        if budget is None:
+            budget = resolve(url.split('?')[0]).func.view_class.query_budget
+        separator = '&' if '?' in url else '?'
+        for page_size in page_sizes or self.budget_page_sizes:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"{url}{separator}page_size={page_size}")
+            self.assertEqual(response.status_code, 200, response.content)
+            if len(queries) > budget:
+                self.fail(
+                    f"{url} at page_size={page_size} issued {len(queries)} queries, over its budget of {budget}:\n"
+                    + "\n".join(q['sql'] for q in queries.captured_queries)
+                )
@@ -1,3 +1,388 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import re
+import zlib
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import Wallet, TransactionHistory
+from accounts import services
+from admin_panel.models import AdminActionLog
+from loans.models import Loan
+from mpesa.models import MpesaTransaction
+from notifications.models import Notification
+from transactions.models import TransactionHistory as LegacyTransaction
+from . import db_router, filters, idempotency
+from .pdf_utils import generate_statement_pdf
+from .models import IdempotencyKey
+from .paginator import EstimatedCountPaginator
+from .testing import QueryBudgetMixin
+
+
+class IdempotencyKeyTests(TestCase):
+    client_class = APIClient
+    url = '/api/accounts/wallet/withdraw/'
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create(username='alice')
+        Wallet.objects.filter(user=self.alice).update(balance=100_00)
+        self.client.force_authenticate(self.alice)
+
+    def withdraw(self, amount='10.00', key='retry-1'):
+        return self.client.post(self.url, {'amount': amount}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_recorded_response_without_moving_money(self):
+        first = self.withdraw()
+        self.assertEqual(first.status_code, 200)
+        cache.clear()  # the table answers when the cache has been evicted
+        for _ in range(2):
+            replay = self.withdraw()
+            self.assertEqual(replay.status_code, 200)
+            self.assertEqual(replay.json(), first.json())
+            self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 90_00)
+        self.assertEqual(TransactionHistory.objects.count(), 1)
+
+    def test_key_reused_with_a_different_body_is_rejected(self):
+        self.withdraw()
+        self.assertEqual(self.withdraw(amount='20.00').status_code, 422)
+        self.assertEqual(self.withdraw(amount='20.00', key='retry-2').status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 70_00)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0.05)
+    def test_duplicate_of_an_in_flight_request_waits_then_gives_up(self):
+        self.withdraw()
+        IdempotencyKey.objects.update(status='processing', response_status=None, response_body=None)
+        cache.clear()
+        response = self.withdraw()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 90_00)
+
+    def test_rejected_request_is_not_replayed(self):
+        self.assertEqual(self.withdraw(amount='500.00').status_code, 400)
+        Wallet.objects.filter(user=self.alice).update(balance=600_00)
+        self.assertEqual(self.withdraw(amount='500.00').status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 100_00)
+
+    def test_wrong_pin_then_correct_pin_under_the_same_key(self):
+        bob = User.objects.create(username='bob')
+        self.alice.profile.set_transfer_pin('1234')
+        url = '/api/accounts/wallet/transfer/'
+        payload = {'receiver_username': 'bob', 'amount': '25.00'}
+        wrong = self.client.post(url, {**payload, 'pin': '0000'}, format='json', HTTP_IDEMPOTENCY_KEY='pay-bob')
+        self.assertEqual(wrong.status_code, 403)
+        right = self.client.post(url, {**payload, 'pin': '1234'}, format='json', HTTP_IDEMPOTENCY_KEY='pay-bob')
+        self.assertEqual(right.status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=bob).balance, 25_00)
+
+    def test_key_commits_together_with_the_wallet_writes(self):
+        with patch('core.idempotency._record', side_effect=RuntimeError("worker died")):
+            with self.assertRaises(RuntimeError):
+                self.withdraw()
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 100_00)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.withdraw().status_code, 200)
+
+    def test_request_that_outlives_its_lease_is_rolled_back(self):
+        real_record = idempotency._record
+
+        def taken_over(row, response):
+            IdempotencyKey.objects.filter(pk=row.pk).update(expires_at=row.expires_at + timedelta(seconds=1))
+            return real_record(row, response)
+
+        with patch('core.idempotency._record', side_effect=taken_over):
+            self.assertEqual(self.withdraw().status_code, 409)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 100_00)
+
+    def test_expired_keys_are_swept_and_can_be_reused(self):
+        self.withdraw()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        cache.clear()
+        out = StringIO()
+        call_command('sweep_idempotency_keys', batch_size=1, stdout=out)
+        self.assertIn("Deleted 1", out.getvalue())
+        self.assertEqual(self.withdraw().status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 80_00)
+
+
+class IdempotentRetryTests(TransactionTestCase):
+    """Outside TestCase's wrapping transaction, so the request's own transaction is the outermost."""
+    client_class = APIClient
+
+    def test_keyed_transfer_is_retried_after_a_lock_error(self):
+        cache.clear()
+        alice, bob = User.objects.create(username='alice'), User.objects.create(username='bob')
+        Wallet.objects.filter(user=alice).update(balance=100_00)
+        alice.profile.set_transfer_pin('1234')
+        self.client.force_authenticate(alice)
+        real_debit, calls = services.debit, []
+
+        def locked_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return real_debit(*args)
+
+        with patch('accounts.services.debit', side_effect=locked_once):
+            response = self.client.post('/api/accounts/wallet/transfer/', {
+                'receiver_username': 'bob', 'amount': '25.00', 'pin': '1234',
+            }, format='json', HTTP_IDEMPOTENCY_KEY='pay-bob')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Wallet.objects.get(user=bob).balance, 25_00)
+        self.assertEqual(IdempotencyKey.objects.get().status, 'completed')
+
+
+class KeysetPaginationTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.client.force_authenticate(self.alice)
+        TransactionHistory.objects.bulk_create([
+            TransactionHistory(user=self.alice, transaction_type='top_up', amount=i) for i in range(25)
+        ])
+        # Several rows share a timestamp so the id tie-breaker is exercised.
+        for i, pk in enumerate(TransactionHistory.objects.values_list('pk', flat=True)):
+            TransactionHistory.objects.filter(pk=pk).update(timestamp=timezone.now() - timedelta(minutes=i // 3))
+
+    def test_walks_every_row_once_with_constant_cost_pages(self):
+        expected = list(TransactionHistory.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        seen = []
+        url = '/api/accounts/wallet/history/?page_size=10'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                body = self.client.get(url).json()
+            sql = " ".join(q['sql'] for q in queries.captured_queries).upper()
+            self.assertNotIn("COUNT(", sql)
+            self.assertNotIn("OFFSET", sql)
+            # One range scan per page, however deep.
+            self.assertEqual(sql.count('FROM "ACCOUNTS_TRANSACTIONHISTORY"'), 1)
+            seen += [row['id'] for row in body['results']]
+            self.assertEqual(body['has_more'], body['next'] is not None)
+            url = body['next']
+        self.assertEqual(seen, expected)
+
+    def test_other_list_endpoints_and_bad_cursor(self):
+        Notification.objects.create(user=self.alice, notif_type='low_balance', message="Low")
+        body = self.client.get('/api/notifications/user/notifications/').json()
+        self.assertEqual((len(body['results']), body['has_more']), (1, False))
+        self.assertEqual(self.client.get('/api/loans/').json()['results'], [])
+        self.assertEqual(self.client.get('/api/accounts/wallet/history/?cursor=bogus').status_code, 404)
+
+
+@override_settings(TIME_ZONE='Africa/Nairobi')
+class DateRangeFilterTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.client.force_authenticate(self.alice)
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise be scanned sequentially.
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                return queryset.explain()
+        return queryset.explain()
+
+    def test_calendar_bounds_are_half_open_utc_ranges(self):
+        start, end = filters.month_bounds(2024, 12)
+        self.assertEqual(start, datetime(2024, 11, 30, 21, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(end, datetime(2024, 12, 31, 21, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(filters.date_bounds(date(2025, 1, 1), None)[0], datetime(2024, 12, 31, 21, 0, tzinfo=dt_timezone.utc))
+        with self.assertRaises(ValueError):
+            filters.date_bounds("31/01/2025")
+
+    def test_history_date_filter_uses_local_days(self):
+        for hour in (20, 21):  # 23:00 on Jan 31 and 00:00 on Feb 1 in Nairobi
+            row = TransactionHistory.objects.create(user=self.alice, transaction_type='top_up', amount=hour)
+            TransactionHistory.objects.filter(pk=row.pk).update(
+                timestamp=datetime(2025, 1, 31, hour, 30, tzinfo=dt_timezone.utc)
+            )
+        body = self.client.get('/api/accounts/wallet/history/?start_date=2025-01-31&end_date=2025-01-31').json()
+        self.assertEqual([row['amount'] for row in body['results']], ["0.20"])
+
+    def test_invalid_amount_bound_leaves_the_other_applied(self):
+        for amount in (5_00, 50_00):
+            LegacyTransaction.objects.create(user=self.alice, amount=amount, type='credit', status='completed')
+        body = self.client.get('/api/transactions/?min_amount=abc&max_amount=10.00').json()
+        self.assertEqual([row['amount'] for row in body['results']], ["5.00"])
+
+    def test_range_filters_use_the_composite_indexes(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest("EXPLAIN output is only checked on SQLite and PostgreSQL.")
+        history = TransactionHistory.objects.filter(user=self.alice)
+        bounds = filters.month_bounds(2025, 1)
+        plan = self.explain(filters.filter_range(history, 'timestamp', bounds).order_by('-timestamp', '-id'))
+        self.assertIn('history_user_ts_id_idx', plan)
+        plan = self.explain(filters.filter_range(history.filter(transaction_type='transfer'), 'timestamp', bounds))
+        self.assertIn('history_user_type_ts_idx', plan)
+        if connection.vendor == 'sqlite':
+            self.assertIn('timestamp>? AND timestamp<?', plan)
+
+
+class ListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.client.force_authenticate(self.alice)
+        TransactionHistory.objects.bulk_create([
+            TransactionHistory(user=self.alice, sender=self.alice, receiver=self.bob if i % 2 else None,
+                               transaction_type='transfer', amount=i)
+            for i in range(30)
+        ])
+        Notification.objects.bulk_create([
+            Notification(user=self.alice, notif_type='low_balance', message=str(i)) for i in range(30)
+        ])
+
+    def test_list_endpoints_stay_within_their_query_budgets(self):
+        for url in ('/api/accounts/wallet/history/', '/api/transactions/', '/api/notifications/user/notifications/',
+                    '/api/loans/'):
+            self.assertWithinQueryBudget(url)
+        row = self.client.get('/api/accounts/wallet/history/?page_size=2').json()['results'][0]
+        self.assertEqual((row['user'], row['sender'], row['amount']), ('alice', 'alice', '0.29'))
+
+
+class StatementPDFTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        TransactionHistory.objects.bulk_create(
+            TransactionHistory(user=self.user, transaction_type='top_up', amount=1_00 + i) for i in range(70)
+        )
+        self.rows = TransactionHistory.objects.filter(user=self.user).order_by('timestamp', 'id')
+
+    def test_pages_share_one_chrome_form_and_xref_is_consistent(self):
+        today = timezone.localdate()
+        with self.assertNumQueries(1):
+            with generate_statement_pdf(self.user, self.rows, today.month, today.year) as f:
+                pdf = f.read()
+
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertIn(b'/Count 3 >>', pdf)  # 31 rows a page
+        start = int(re.search(rb'startxref\n(\d+)', pdf).group(1))
+        self.assertTrue(pdf[start:].startswith(b'xref'))
+        for number, offset in enumerate(re.findall(rb'(\d{10}) 00000 n', pdf[start:]), 1):
+            self.assertTrue(pdf[int(offset):].startswith(b'%d 0 obj' % number))
+
+        streams = [zlib.decompress(s) for s in re.findall(rb'stream\n(.*?)\nendstream', pdf, re.S)]
+        chrome, pages = streams[0], streams[1:]
+        self.assertIn(b'(User: alice)', chrome)
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(all(page.startswith(b'/Chrome Do') and b'alice' not in page for page in pages))
+        self.assertIn(b'(KES 1.69)', pages[-1])
+        self.assertIn(b'(Top-Up)', pages[0])
+
+    def test_text_is_encoded_as_win_ansi(self):
+        self.user.username = 'Zoë “€” 🙂'
+        today = timezone.localdate()
+        with generate_statement_pdf(self.user, self.rows, today.month, today.year) as f:
+            chrome = zlib.decompress(re.search(rb'stream\n(.*?)\nendstream', f.read(), re.S).group(1))
+
+        # cp1252 bytes for the WinAnsiEncoding fonts; the emoji has no glyph there.
+        self.assertIn(b'(User: Zo\xeb \x93\x80\x94 ?)', chrome)
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Changelists of the large money tables issue a fixed number of queries, whatever the page holds."""
+    changelists = [
+        '/admin/accounts/transactionhistory/',
+        '/admin/accounts/wallet/',
+        '/admin/transactions/transactionhistory/',
+        '/admin/mpesa/mpesatransaction/',
+        '/admin/admin_panel/adminactionlog/',
+    ]
+    budget = 7  # session, user, count, page rows and the date hierarchy
+
+    def setUp(self):
+        self.staff = User.objects.create(username='root', is_staff=True, is_superuser=True)
+        self.client.force_login(self.staff)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = User.objects.count()
+            customer = User.objects.create(username=f'customer{n}')
+            services.top_up(customer, 10_00)
+            LegacyTransaction.objects.create(user=customer, amount=10_00, type='credit', status='completed')
+            mpesa = MpesaTransaction.objects.create(
+                user=customer, phone_number='254700000000', amount=10_00, checkout_request_id=f'ws_CO_{n}'
+            )
+            loan = Loan.objects.create(user=customer, amount=100_00)
+            AdminActionLog.objects.create(
+                admin_user=self.staff, action='approve_loan', target_user=customer, loan=loan, transaction=mpesa
+            )
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.add_rows(2)
+        few = {url: self.queries(url) for url in self.changelists}
+        self.add_rows(12)
+        for url in self.changelists:
+            with self.subTest(url=url):
+                self.assertEqual(self.queries(url), few[url])
+                self.assertLessEqual(few[url], self.budget)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=5)
+    def test_large_tables_are_estimated_or_capped(self):
+        self.add_rows(8)
+        history = TransactionHistory.objects.all()
+        history.filter(pk=history.order_by('pk')[0].pk).delete()  # e.g. archived
+        self.assertEqual(EstimatedCountPaginator(history, 10).count, history.count())
+        self.assertEqual(EstimatedCountPaginator(history.filter(amount=10_00), 10).count, 5)
+
+
+@override_settings(DATABASE_REPLICA_READS=True, READ_YOUR_WRITES_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    """Two separate test databases: the replica has alice's account but lags behind her activity."""
+    client_class = APIClient
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create(username='alice')
+        User.objects.using('replica').bulk_create([User(pk=self.alice.pk, username='alice')])
+        services.top_up(self.alice, 100_00)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.alice).access_token}")
+
+    def history(self):
+        return self.client.get('/api/accounts/wallet/history/').json()['results']
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(db_router.PrimaryReplicaRouter().db_for_read(User), 'default')
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.history(), [])
+        export = self.client.get('/api/accounts/wallet/history/export/csv/')
+        self.assertEqual(len(b"".join(export.streaming_content).splitlines()), 1)  # header only
+
+    def test_a_write_pins_the_user_to_the_primary(self):
+        response = self.client.post('/api/accounts/wallet/top-up/', {'amount': '5.00'}, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['amount'] for row in self.history()], ["5.00", "100.00"])
+        cache.delete(f"db:primary-pin:{self.alice.pk}")  # the window has passed
+        self.assertEqual(self.history(), [])
+
+    def test_read_from_primary_views_skip_the_replica(self):
+        self.assertEqual(self.client.get('/api/accounts/wallet/').json()['balance'], "100.00")
+
+    @override_settings(DATABASE_REPLICA_READS=False)
+    def test_replica_reads_can_be_switched_off(self):
+        self.assertEqual(len(self.history()), 1)
@@ -1,6 +1,5 @@
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -12,7 +11,7 @@ from .serializers import (
     TransactionSerializer, SetTransferPinSerializer,
     TransferSerializer, TransactionHistorySerializer
 )
-from .utils import generate_statement_pdf
+from . import filters
 
 
 # --- Auth/Register ---
@@ -100,38 +99,8 @@ class TransactionHistoryListView(generics.ListAPIView):
         if tx_type:
             queryset = queryset.filter(transaction_type=tx_type)
         if date:
-            queryset = queryset.filter(timestamp__date=date)
+            queryset = filters.filter_range(queryset, 'timestamp', filters.date_bounds(date, date))
         if amount:
             queryset = queryset.filter(amount=amount)
 
         return queryset
-
-
-# --- Generate PDF Bank Statement ---
-class PDFStatementView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get(self, request):
-        user = request.user
-        month = request.query_params.get('month')
-        year = request.query_params.get('year')
-
-        try:
-            month = int(month)
-            year = int(year)
-        except (TypeError, ValueError):
-            return Response({'error': 'Month and Year must be provided as integers.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        transactions = TransactionHistory.objects.filter(
-            user=user,
-            timestamp__month=month,
-            timestamp__year=year
-        ).order_by('timestamp')
-
-        if not transactions.exists():
-            return Response({'error': 'No transactions found for this period.'}, status=status.HTTP_404_NOT_FOUND)
-
-        pdf_buffer = generate_statement_pdf(user, transactions, month, year)
-        filename = f"{user.username}_statement_{month}_{year}.pdf"
-
-        return FileResponse(pdf_buffer, as_attachment=True, filename=filename)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:52
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# Amounts move from DecimalField to integer cents: widen the decimal columns so
+# scaling can't overflow them, multiply every value by 100, then switch the
+# columns to bigint.
+MONEY_FIELDS = [
+    ('loan', 'amount'),
+    ('loan', 'total_due'),
+]
+
+
+def decimal_to_cents(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('loans', model_name).objects.update(**{field: Round(F(field) * 100)})
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('loans', model_name).objects.update(**{field: F(field) * Decimal('0.01')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_loan_interest_rate_loan_total_due'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loan',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='total_due',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        migrations.AlterField(
+            model_name='loan',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='total_due',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -2,7 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
 def default_repayment_date():
     return timezone.now().date() + timedelta(days=30)
@@ -16,17 +16,18 @@ class Loan(models.Model):
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.BigIntegerField()  # cents
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('10.00'))  # 10% default
-    total_due = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    total_due = models.BigIntegerField(blank=True, null=True)  # cents
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     applied_at = models.DateTimeField(auto_now_add=True)
     repayment_date = models.DateField(default=default_repayment_date)
     score = models.IntegerField(default=0)  # Eligibility score (0–100)
 
     def calculate_total_due(self):
-        interest = self.amount * (self.interest_rate / Decimal('100'))
-        return self.amount + interest
+        # Interest is rounded half-up to the nearest cent.
+        interest = (self.amount * self.interest_rate / Decimal('100')).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        return self.amount + int(interest)
 
     def save(self, *args, **kwargs):
         if self.total_due is None:
@@ -35,3 +36,8 @@ class Loan(models.Model):
 
     def __str__(self):
         return f"Loan {self.id} | {self.user.username} | {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'applied_at', 'id'], name='loan_user_applied_id_idx'),
+        ]
@@ -1,7 +1,12 @@
 from rest_framework import serializers
+from core.money import MoneyField
+
 from .models import Loan
 
 class LoanSerializer(serializers.ModelSerializer):
+    amount = MoneyField(read_only=True)
+    total_due = MoneyField(read_only=True)
+
     class Meta:
         model = Loan
         fields = '__all__'
@@ -7,7 +7,7 @@ def check_loan_eligibility(user):
 
     # Simple scoring: based on balance and past transactions
     score = 0
-    if wallet.balance >= 500:
+    if wallet.balance >= 500_00:
         score += 30
     if user.transactions_sent.count() >= 3:
         score += 30
@@ -1,3 +1,4 @@
+from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -5,8 +6,11 @@ from django.shortcuts import get_object_or_404
 from .models import Loan
 from .serializers import LoanSerializer
 from .utils import check_loan_eligibility
+from django.db import transaction
 from accounts.models import Wallet
-from decimal import Decimal
+from accounts import services
+from core import money
+from core.pagination import KeysetPagination
 
 
 class LoanApplicationView(APIView):
@@ -17,10 +21,8 @@ class LoanApplicationView(APIView):
         amount = request.data.get('amount')
 
         try:
-            amount = Decimal(amount)
-            if amount <= 0:
-                raise ValueError
-        except:
+            amount = money.parse_amount(amount)
+        except ValueError:
             return Response({"detail": "Invalid loan amount"}, status=400)
 
         score = check_loan_eligibility(user)
@@ -34,30 +36,31 @@ class LoanApplicationView(APIView):
         if Loan.objects.filter(user=user, status='approved').exists():
             return Response({"detail": "You already have an active loan"}, status=400)
 
-        loan = Loan.objects.create(
-            user=user,
-            amount=amount,
-            score=score,
-            status='approved'
-            # interest_rate and total_due auto-calculated in model's save()
-        )
-
         try:
-            wallet = Wallet.objects.get(user=user)
-            wallet.balance += amount
-            wallet.save()
+            with transaction.atomic():
+                loan = Loan.objects.create(
+                    user=user,
+                    amount=amount,
+                    score=score,
+                    status='approved'
+                    # interest_rate and total_due auto-calculated in model's save()
+                )
+                services.credit_from('loans', user.pk, amount, 'loan_disbursement', f"Loan {loan.pk} disbursement")
         except Wallet.DoesNotExist:
             return Response({"detail": "Wallet not found"}, status=404)
 
         return Response(LoanSerializer(loan).data, status=201)
 
 
-class LoanListView(APIView):
+class LoanListView(generics.ListAPIView):
+    serializer_class = LoanSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = 'applied_at'
+    query_budget = 1
 
-    def get(self, request):
-        loans = Loan.objects.filter(user=request.user).order_by('-applied_at')
-        return Response(LoanSerializer(loans, many=True).data)
+    def get_queryset(self):
+        return Loan.objects.filter(user=self.request.user)
 
 
 class LoanRepayView(APIView):
@@ -73,19 +76,16 @@ class LoanRepayView(APIView):
         if loan.status != 'approved':
             return Response({"detail": "Loan already repaid or not eligible for repayment"}, status=400)
 
+        #  Use total_due for repayment
         try:
-            wallet = Wallet.objects.get(user=user)
+            with transaction.atomic():
+                # Guarded status flip so two concurrent repayments can't both debit.
+                if not Loan.objects.filter(pk=loan.pk, status='approved').update(status='repaid'):
+                    return Response({"detail": "Loan already repaid or not eligible for repayment"}, status=400)
+                services.debit_to('loans', user.pk, loan.total_due, 'loan_repayment', f"Loan {loan.pk} repayment")
         except Wallet.DoesNotExist:
             return Response({"detail": "Wallet not found"}, status=404)
-
-        #  Use total_due for repayment
-        if wallet.balance < loan.total_due:
+        except services.InsufficientFunds:
             return Response({"detail": "Insufficient wallet balance"}, status=400)
 
-        wallet.balance -= loan.total_due
-        wallet.save()
-
-        loan.status = 'repaid'
-        loan.save()
-
         return Response({"detail": "Loan repaid successfully"}, status=200)
@@ -1,4 +1,20 @@
 from django.contrib import admin
+from core.money import format_kes
+from core.paginator import EstimatedCountPaginator
 from .models import MpesaTransaction
 
-admin.site.register(MpesaTransaction)
+@admin.register(MpesaTransaction)
+class MpesaTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'phone_number', 'formatted_amount', 'status', 'mpesa_receipt_number', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('status', 'created_at')
+    date_hierarchy = 'created_at'
+    search_fields = ('=checkout_request_id', '=mpesa_receipt_number', '=phone_number', '=user__username')
+    autocomplete_fields = ('user',)
+    readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formatted_amount(self, obj):
+        return format_kes(obj.amount)
+    formatted_amount.short_description = 'Amount'
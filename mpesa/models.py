@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from core.money import format_cents
 
 
 class MpesaTransaction(models.Model):
@@ -28,10 +29,8 @@ class MpesaTransaction(models.Model):
         help_text="Phone number in format 2547XXXXXXXX"
     )
 
-    amount = models.DecimalField(
-        max_digits=10,
-        decimal_places=2,
-        help_text="Amount transacted via M-Pesa"
+    amount = models.BigIntegerField(
+        help_text="Amount transacted via M-Pesa, in cents"
     )
 
     account_reference = models.CharField(
@@ -102,9 +101,12 @@ class MpesaTransaction(models.Model):
     )
 
     def __str__(self):
-        return f"{self.user.username} | {self.amount} KES | {self.status}"
+        return f"{self.user.username} | {format_cents(self.amount)} KES | {self.status}"
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = "M-Pesa Transaction"
         verbose_name_plural = "M-Pesa Transactions"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='mpesa_created_id_idx'),
+        ]
@@ -1,3 +1,41 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import JournalEntry, Wallet
+
+from .models import MpesaTransaction
+
+
+class STKCallbackTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.payment = MpesaTransaction.objects.create(
+            user=self.alice, phone_number='254700000000', amount=250_00, checkout_request_id='ws_CO_1',
+            merchant_request_id='m-1', status='pending',
+        )
+
+    def callback(self, result_code=0):
+        return self.client.post('/api/mpesa/stk-push/callback/', {'Body': {'stkCallback': {
+            'CheckoutRequestID': 'ws_CO_1',
+            'ResultCode': result_code,
+            'ResultDesc': "The service request is processed successfully.",
+            'CallbackMetadata': {'Item': [{'Name': 'MpesaReceiptNumber', 'Value': 'QKX1'}]},
+        }}}, format='json')
+
+    def test_redelivered_callback_credits_once(self):
+        self.assertEqual(self.callback().status_code, 200)
+        self.assertEqual(self.callback().status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 250_00)
+        self.assertEqual(JournalEntry.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.mpesa_receipt_number), ('completed', 'QKX1'))
+
+    def test_failed_payment_is_not_credited_by_a_later_success(self):
+        self.callback(result_code=1032)
+        self.callback()
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, 0)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'failed')
@@ -5,9 +5,13 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
 from .daraja import initiate_stk_push
 from .models import MpesaTransaction
-from accounts.models import Wallet
+from accounts import services
+from core.idempotency import idempotent
+from core.money import CENTS_PER_UNIT, format_cents
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +20,7 @@ logger = logging.getLogger(__name__)
 class STKPushView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         phone = request.data.get("phone")
@@ -43,7 +48,7 @@ class STKPushView(APIView):
             MpesaTransaction.objects.create(
                 user=user,
                 phone_number=phone,
-                amount=amount,
+                amount=amount * CENTS_PER_UNIT,  # Daraja takes whole shillings
                 account_reference=reference,
                 description=description,
                 checkout_request_id=response.get("CheckoutRequestID", ""),
@@ -79,24 +84,25 @@ class STKCallbackView(APIView):
             logger.warning("Transaction not found for callback: %s", checkout_id)
             return Response({"detail": "Transaction not found"}, status=404)
 
-        transaction.result_code = result_code
-        transaction.result_desc = result_desc
-
         if result_code == 0:
-            # Extract metadata
             metadata = callback.get("CallbackMetadata", {}).get("Item", [])
             receipt = next((item["Value"] for item in metadata if item["Name"] == "MpesaReceiptNumber"), None)
-
-            transaction.mpesa_receipt_number = receipt
-            transaction.status = 'completed'
-
-            # Update wallet balance
-            wallet = Wallet.objects.get(user=transaction.user)
-            wallet.balance += transaction.amount
-            wallet.save()
-            logger.info("Wallet updated for user %s with KSh %.2f", transaction.user.username, transaction.amount)
+            outcome = {'status': 'completed', 'mpesa_receipt_number': receipt}
         else:
-            transaction.status = 'failed'
+            outcome = {'status': 'failed'}
 
-        transaction.save()
+        # Balance credit and status change commit together.
+        with db_transaction.atomic():
+            # Guarded status flip so a redelivered or racing callback can't credit twice.
+            flipped = MpesaTransaction.objects.filter(pk=transaction.pk, status='pending').update(
+                result_code=result_code, result_desc=result_desc, updated_at=timezone.now(), **outcome
+            )
+            if not flipped:
+                logger.info("Callback for %s already processed", checkout_id)
+                return Response({"detail": "Callback already processed"}, status=200)
+            if result_code == 0:
+                services.credit_from(
+                    'mpesa', transaction.user_id, transaction.amount, 'mpesa_deposit', f"M-Pesa receipt {receipt}"
+                )
+                logger.info("Wallet updated for user %s with KSh %s", transaction.user.username, format_cents(transaction.amount))
         return Response({"detail": "Callback processed"}, status=200)
@@ -16,3 +16,8 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.notif_type}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp', 'id'], name='notif_user_ts_id_idx'),
+        ]
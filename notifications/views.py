@@ -1,10 +1,14 @@
 from rest_framework import generics, permissions
+
+from core.pagination import KeysetPagination
 from .models import Notification
 from .serializers import NotificationSerializer
 
 class UserNotificationsView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    query_budget = 1
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-timestamp')
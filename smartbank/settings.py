@@ -49,6 +49,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.db_router.ReplicaRoutingMiddleware",  # After authentication: pins users who wrote
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "core.middleware.LogAPIErrorsMiddleware",  # Custom logging middleware
@@ -76,12 +77,58 @@ TEMPLATES = [
 ]
 
 # DATABASE
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite by default. DB_ENGINE=postgresql selects PostgreSQL from the DB_* variables below, which
+# production needs: SQLite lets one writer in at a time, capping concurrent transfers.
+if os.getenv("DB_ENGINE", "sqlite") == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "smartbank"),
+            "USER": os.getenv("DB_USER", "smartbank"),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            # Persistent connections: each worker keeps its connection across requests for this
+            # many seconds and checks it is still alive before reusing it.
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+            # .iterator() (history export, statements, archiving, analytics) streams through
+            # server-side cursors; turn them off behind PgBouncer in transaction pooling mode.
+            "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DB_DISABLE_SERVER_SIDE_CURSORS", "False") == "True",
+            "OPTIONS": {
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+                "application_name": os.getenv("DB_APPLICATION_NAME", "smartbank"),
+            },
+        }
     }
-}
+    if os.getenv("DB_POOL_MAX_SIZE"):
+        # A connection pool shared by a process's threads instead of one persistent connection
+        # each; the psycopg pool extra in requirements.txt provides it.
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE")),
+            "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+# Read replica (core.db_router): DB_REPLICA_HOST for PostgreSQL, DB_REPLICA_NAME for SQLite.
+# Without either the alias is the primary itself and replica reads are off; tests get it as a
+# second, separate database.
+REPLICA_OVERRIDES = {key: os.getenv(f"DB_REPLICA_{key}") for key in ("NAME", "HOST", "PORT")}
+DATABASES["replica"] = {**DATABASES["default"], **{key: value for key, value in REPLICA_OVERRIDES.items() if value}}
+if DATABASES["replica"]["ENGINE"].endswith("postgresql"):
+    DATABASES["replica"]["TEST"] = {"NAME": f"test_{DATABASES['default']['NAME']}_replica"}
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+# Serve safe-method API and admin reads from the replica.
+DATABASE_REPLICA_READS = any(REPLICA_OVERRIDES.values())
+# After a request writes, its user reads from the primary for this many seconds.
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
 
 # AUTHENTICATION
 AUTH_PASSWORD_VALIDATORS = [
@@ -91,6 +138,15 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "accounts.hashers.TransferPinHasher",
+]
+
 # INTERNATIONALIZATION
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Africa/Nairobi"
@@ -102,6 +158,15 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Customer financial data (statements, history archive) lives outside MEDIA_ROOT so it is never served as media.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "private": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.getenv("PRIVATE_STORAGE_ROOT", BASE_DIR / "private")},
+    },
+}
 
 # CORS CONFIGURATION
 CORS_ALLOWED_ORIGINS = [
@@ -139,6 +204,59 @@ SIMPLE_JWT = {
 # EMAIL
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# WALLETS
+# Retries for wallet mutations that hit a serialization failure, deadlock or lock timeout.
+WALLET_MUTATION_MAX_RETRIES = int(os.getenv("WALLET_MUTATION_MAX_RETRIES", "5"))
+# Number of balance shards a wallet gets when switched to hot-wallet mode.
+HOT_WALLET_DEFAULT_SHARDS = int(os.getenv("HOT_WALLET_DEFAULT_SHARDS", "8"))
+# A wallet's journal balance is snapshotted every this many postings (and daily by take_balance_snapshots).
+LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "100"))
+# Rows applied per transaction by the bulk disbursement endpoint.
+BULK_TRANSFER_CHUNK_SIZE = int(os.getenv("BULK_TRANSFER_CHUNK_SIZE", "1000"))
+# Work factor for transfer PIN hashes (accounts.hashers.TransferPinHasher).
+TRANSFER_PIN_HASH_ITERATIONS = int(os.getenv("TRANSFER_PIN_HASH_ITERATIONS", "100000"))
+# How long a transfer authorization issued by wallet/authorize/ stays valid, in seconds.
+TRANSFER_AUTH_TOKEN_LIFETIME = int(os.getenv("TRANSFER_AUTH_TOKEN_LIFETIME", "300"))
+# Account numbers each process reserves from the database at a time (accounts.account_numbers).
+ACCOUNT_NUMBER_BLOCK_SIZE = int(os.getenv("ACCOUNT_NUMBER_BLOCK_SIZE", "100"))
+# Rows each customer's daily activity rollup is spread over, so concurrent payments into one
+# wallet don't serialise on a single rollup row (accounts.rollups).
+DAILY_ROLLUP_SLOTS = int(os.getenv("DAILY_ROLLUP_SLOTS", "4"))
+# Rows fetched per server-side cursor round trip by the history export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+# Lifetime of cached spending insights (accounts.analytics); new activity invalidates them sooner.
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "3600"))
+# History older than this many days (whole months) is moved to compressed archive files
+# by the archive_history command (accounts.archive).
+HISTORY_ARCHIVE_HORIZON_DAYS = int(os.getenv("HISTORY_ARCHIVE_HORIZON_DAYS", "365"))
+# Rows per independently gzipped block of an archive file; one sparse index entry each.
+HISTORY_ARCHIVE_BLOCK_ROWS = int(os.getenv("HISTORY_ARCHIVE_BLOCK_ROWS", "1000"))
+# Lifetime of cached wallet read models and version pointers, in seconds.
+WALLET_CACHE_TTL = int(os.getenv("WALLET_CACHE_TTL", "300"))
+
+# CACHE
+# Idempotency keys and wallet snapshots must be shared by every worker in production,
+# e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# IDEMPOTENCY
+# How long a recorded response is replayed for a repeated Idempotency-Key, in seconds.
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+# How long a duplicate waits for the in-flight request holding its key before answering 409.
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))
+# A key still "processing" after this many seconds (crashed worker) can be claimed again. Keep it
+# well above the slowest money-moving request: a request that outlives its lease is rolled back.
+IDEMPOTENCY_PROCESSING_LEASE = int(os.getenv("IDEMPOTENCY_PROCESSING_LEASE", "60"))
+
+# ADMIN
+# Filtered changelists on the large money tables count at most this many rows (core.paginator).
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", "10000"))
+
 # MPESA SETTINGS
 MPESA_CONSUMER_KEY = os.getenv("MPESA_CONSUMER_KEY")
 MPESA_CONSUMER_SECRET = os.getenv("MPESA_CONSUMER_SECRET")
@@ -1,8 +1,14 @@
 from django.contrib import admin
+from core.paginator import EstimatedCountPaginator
 from .models import TransactionHistory
 
 @admin.register(TransactionHistory)
 class TransactionHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'type', 'amount', 'status', 'timestamp')
+    list_select_related = ('user',)
     list_filter = ('type', 'status', 'timestamp')
-    search_fields = ('user__username', 'sender', 'receiver')
+    date_hierarchy = 'timestamp'
+    search_fields = ('=user__username', '=sender', '=receiver')
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
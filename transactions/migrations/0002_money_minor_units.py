@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:52
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# Amounts move from DecimalField to integer cents: widen the decimal columns so
+# scaling can't overflow them, multiply every value by 100, then switch the
+# columns to bigint.
+MONEY_FIELDS = [
+    ('transactionhistory', 'amount'),
+]
+
+
+def decimal_to_cents(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('transactions', model_name).objects.update(**{field: Round(F(field) * 100)})
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        apps.get_model('transactions', model_name).objects.update(**{field: F(field) * Decimal('0.01')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactionhistory',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        migrations.AlterField(
+            model_name='transactionhistory',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from core.money import format_cents
 
 class TransactionHistory(models.Model):
     TRANSACTION_TYPES = (
@@ -16,10 +17,17 @@ class TransactionHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     sender = models.CharField(max_length=255, blank=True, null=True)
     receiver = models.CharField(max_length=255, blank=True, null=True)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.BigIntegerField()  # cents
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     status = models.CharField(max_length=10, choices=TRANSACTION_STATUS)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.username} - {self.type} - {self.amount}"
+        return f"{self.user.username} - {self.type} - {format_cents(self.amount)}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp', 'id'], name='txn_user_ts_id_idx'),
+            models.Index(fields=['user', 'type', 'timestamp'], name='txn_user_type_ts_idx'),
+            models.Index(fields=['timestamp'], name='txn_ts_idx'),  # admin date hierarchy
+        ]
@@ -1,7 +1,11 @@
 from rest_framework import serializers
+from core.money import MoneyField
+
 from .models import TransactionHistory
 
 class TransactionSerializer(serializers.ModelSerializer):
+    amount = MoneyField(read_only=True)
+
     class Meta:
         model = TransactionHistory
         fields = '__all__'
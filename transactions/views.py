@@ -1,10 +1,16 @@
-from rest_framework import generics, filters, permissions
+from rest_framework import generics, permissions
+from core import filters
+from core.money import to_cents
+from core.pagination import KeysetPagination
+
 from .models import TransactionHistory
 from .serializers import TransactionSerializer
 
 class TransactionListView(generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    query_budget = 1
 
     def get_queryset(self):
         queryset = TransactionHistory.objects.filter(user=self.request.user)
@@ -16,11 +22,19 @@ class TransactionListView(generics.ListAPIView):
 
         if transaction_type:
             queryset = queryset.filter(type=transaction_type)
-        if min_amount:
-            queryset = queryset.filter(amount__gte=min_amount)
-        if max_amount:
-            queryset = queryset.filter(amount__lte=max_amount)
-        if start_date and end_date:
-            queryset = queryset.filter(timestamp__range=[start_date, end_date])
+        try:
+            if min_amount:
+                queryset = queryset.filter(amount__gte=to_cents(min_amount))
+        except ValueError:
+            pass
+        try:
+            if max_amount:
+                queryset = queryset.filter(amount__lte=to_cents(max_amount))
+        except ValueError:
+            pass
+        try:
+            queryset = filters.filter_range(queryset, 'timestamp', filters.date_bounds(start_date, end_date))
+        except ValueError:
+            pass
 
         return queryset.order_by('-timestamp')